@@ -0,0 +1,122 @@
+# Copyright (c) 2010-2017 Bo Lin
+# Copyright (c) 2010-2017 Yanhong Annie Liu
+# Copyright (c) 2010-2017 Stony Brook University
+# Copyright (c) 2010-2017 The Research Foundation of SUNY
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""On-disk cache of parsed DistAlgo ASTs.
+
+Entries are keyed by the SHA-256 of the source text, the DistAlgo and Python
+versions, and the command line options that affect parsing. Since resolving
+process base classes parses imported DistAlgo modules, each entry also records
+the modules that were loaded by the resolver, and is discarded if any of them
+has changed since.
+
+"""
+
+import os
+import sys
+import pickle
+import hashlib
+import importlib.util
+import importlib._bootstrap_external
+
+from da import common
+from . import dast, symtab
+
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or
+    os.path.join(os.path.expanduser('~'), '.cache'),
+    'distalgo', 'ast')
+
+# Command line options that affect the generated DistAlgo AST:
+KEY_OPTIONS = [
+    'full_event_pattern', 'enable_object_pattern',
+    'enable_membertest_pattern', 'enable_iterator_pattern',
+    'use_top_semantic', 'geninc', 'no_table1', 'no_table2', 'no_table3',
+    'no_table4', 'jb_style', 'no_all_tables', 'module_name'
+]
+
+# Cache statistics:
+Hits = 0
+Misses = 0
+
+def cache_key(src, args):
+    """Returns the cache key for source string `src` compiled with `args`."""
+    h = hashlib.sha256(src.encode('utf-8'))
+    h.update(repr((common.__version__, sys.hexversion,
+                   [getattr(args, opt, None) for opt in KEY_OPTIONS]))
+             .encode('utf-8'))
+    return h.hexdigest()
+
+def _cache_file(key):
+    return os.path.join(CACHE_DIR, key + '.pickle')
+
+def _module_stamp(name):
+    """Returns (origin, mtime, size) of the source for module `name`, or None
+    if the module can not be found.
+
+    """
+    try:
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.has_location:
+            return None
+        stats = os.stat(spec.origin)
+        return spec.origin, stats.st_mtime_ns, stats.st_size
+    except Exception:
+        return None
+
+def _dependencies():
+    """Returns the stamps of all modules loaded by the resolver so far."""
+    with symtab._modules_lock:
+        names = list(symtab.modules)
+    return [(name, _module_stamp(name)) for name in names]
+
+def _is_current(deps):
+    # Names are resolved again, since a module that shadows the recorded one
+    # may have been added since:
+    return all(_module_stamp(name) == stamp for name, stamp in deps)
+
+def load(key):
+    """Returns the cached DistAlgo AST for `key`, or None on a cache miss."""
+    global Hits, Misses
+    try:
+        with open(_cache_file(key), 'rb') as infd:
+            deps, index, daast = pickle.load(infd)
+        if _is_current(deps):
+            # Node counters are read during code generation:
+            dast.DistNode._index = index
+            Hits += 1
+            return daast
+    except Exception:
+        pass
+    Misses += 1
+    return None
+
+def store(key, daast):
+    """Saves `daast` under `key`. Failure to write the cache is not an error."""
+    try:
+        data = pickle.dumps((_dependencies(), dast.DistNode._index, daast),
+                            pickle.HIGHEST_PROTOCOL)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        importlib._bootstrap_external._write_atomic(_cache_file(key), data)
+    except Exception:
+        pass
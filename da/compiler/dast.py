@@ -34,6 +34,10 @@ def flatten_attr(obj, attr_name):
     else:
         return getattr(obj, attr_name)
 
+def _new_node(nodecls):
+    # Creates an uninitialized node for unpickling:
+    return nodecls.__new__(nodecls)
+
 ##################################################
 # AST classes:
 
@@ -73,6 +77,11 @@ def __init__(self, parent=None, ast=None):
     def reset_index(cls):
         cls._index = 0
 
+    def __reduce__(self):
+        # `ast.AST.__reduce__` calls the node class without arguments, which
+        # most DistNode subclasses do not accept:
+        return (_new_node, (type(self),), self.__dict__)
+
     def clone(self):
         nodecls = type(self)
         # All DistNode subtypes must have __init__ signature:
@@ -626,6 +635,16 @@ def last_assignment_before(self, place):
                 last = node
         return last
 
+    def assignments_before(self, place):
+        """Returns all assignments preceding `place`, in program order."""
+        res = []
+        for idxtype, (node, typctx) in self._indexes:
+            if node.is_contained_in(place):
+                break
+            if idxtype is AssignmentCtx:
+                res.append(node)
+        return res
+
     def is_assigned_in(self, node):
         """True if this name is being assigned to inside 'node'."""
 
@@ -2349,6 +2368,23 @@ def __init__(self, parent, ast=None):
         self.module = None
         self.items = []
         self.level = 0
+        self._alias_index = None
+
+    def original_name(self, name):
+        """Returns the name in the source module that this statement binds to
+        the local 'name', or 'name' itself if no item matches.
+
+        """
+        if self._alias_index is None:
+            # Built on first use, after the parser has filled in 'items'. The
+            # first item matching by either name wins:
+            index = dict()
+            for alias in self.items:
+                index.setdefault(alias.name, alias.name)
+                if alias.asname is not None:
+                    index.setdefault(alias.asname, alias.name)
+            self._alias_index = index
+        return self._alias_index.get(name, name)
 
 class Alias(DistNode):
     _fields = ['name', 'asname']
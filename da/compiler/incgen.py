@@ -30,6 +30,7 @@
 from .pygen import *
 from .parser import Pattern2Constant
 from .utils import printe, printd, printw, OptionsManager, to_source
+from .utils import debug_enabled
 
 INC_MODULE_VAR = "IncModule"
 
@@ -69,8 +70,10 @@
 ##########
 # Auxiliary methods:
 
-def iprintd(message):
-    printd(message, filename=ModuleFilename)
+def iprintd(message, *args):
+    # Messages often include whole subtrees, only format them when needed:
+    if debug_enabled():
+        printd(message % args if args else message, filename=ModuleFilename)
 
 def iprintw(message):
     printw(message, filename=ModuleFilename)
@@ -126,7 +129,7 @@ def domain_for_condition(domainspec, condition):
             value = [dast.FreePattern(domainspec.pattern, value=fv.value)
                      for fv in expr.elem.subexprs])
     domainspec.domain = expr
-    iprintd("domain_for_condition: " + str(expr))
+    iprintd("domain_for_condition: %s", expr)
     return expr
 
 def optimize_tuple(elt):
@@ -253,7 +256,7 @@ def process_query(query, state):
 
     assert isinstance(query, dast.Expression)
 
-    iprintd("Processing %r" % query)
+    iprintd("Processing %r", query)
     qname = QUERY_STUB_FORMAT % state.counter
     state.counter += 1
     params = extract_query_parameters(query)
@@ -1198,7 +1201,7 @@ def do_table4_transformation(self, node):
                     domain_for_condition(newnode.domains[-1], e)
                     newnode.subexprs = pred.subexprs[0:i] + \
                                        pred.subexprs[(i+1):]
-                    iprintd("do_table4_transformation: newnode: " + str(newnode))
+                    iprintd("do_table4_transformation: newnode: %s", newnode)
                     res = self.do_table3_transformation(newnode)
                     if res is not None:
                         return res
@@ -1254,7 +1257,7 @@ def do_table3_transformation(self, node):
         if not (isinstance(pred, dast.ComparisonExpr) and
                 pred.comparator in
                 {dast.LtOp, dast.LtEOp, dast.GtOp, dast.GtEOp}):
-            iprintd("Table 3 can not be applied to %s: not comparison" % node)
+            iprintd("Table 3 can not be applied to %s: not comparison", node)
             return None
 
         # All free variables must appear on one side of the comparison:
@@ -1273,12 +1276,11 @@ def do_table3_transformation(self, node):
             y = pred.left
         else:
             iprintd("Table 3 can not be applied to %s: free var distribution."
-                    "left %s : right %s" %
-                   (node, left, right))
+                    "left %s : right %s", node, left, right)
             return None
 
         generators = [self.visit(dom) for dom in node.domains]
-        iprintd("do_table3_transformation: generators = " + str(generators))
+        iprintd("do_table3_transformation: generators = %s", generators)
         # Need to normalize tuples here, for comparison:
         pyx = optimize_tuple(self.visit(x))
         pyy = optimize_tuple(self.visit(y))
@@ -1287,7 +1289,8 @@ def do_table3_transformation(self, node):
             s = sp = generators[0].iter
         else:
             s = SetComp(pyx, generators)
-            iprintd("table3 s: " + to_source(s))
+            if debug_enabled():
+                iprintd("table3 s: " + to_source(s))
             if Options.jb_style:
                 # jb_style can not handle generator expressions:
                 sp = s
@@ -35,9 +35,13 @@
 from .utils import MalformedStatementError
 from .utils import ResolverException
 from .utils import printe
+from .utils import debug_enabled
 
 from pprint import pprint
 
+# Length of the last source file read by `daast_from_file`, for benchmark stats:
+InputSize = 0
+
 # DistAlgo keywords
 KW_ENTRY_POINT = "main"
 KW_PROCESS_DEF = "process"
@@ -199,13 +203,22 @@ def daast_from_file(filename, args):
             global InputSize
             src = infd.read()
             InputSize = len(src)
-            return daast_from_str(src, filename, args)
+        if args is not None and getattr(args, 'ast_cache', False):
+            from . import astcache
+            key = astcache.cache_key(src, args)
+            daast = astcache.load(key)
+            if daast is not None:
+                sys.stderr.write("%s compiled with 0 errors and 0 warnings "
+                                 "(cached).\n" % filename)
+                return daast
+            return daast_from_str(src, filename, args, _cache_key=key)
+        return daast_from_str(src, filename, args)
     except Exception as e:
         print(type(e).__name__, ':', str(e), file=sys.stderr)
         raise e
     return None
 
-def daast_from_str(src, filename='<str>', args=None):
+def daast_from_str(src, filename='<str>', args=None, _cache_key=None):
     """Generates DistAlgo AST from source string.
 
     'src' is the DistAlgo source string to parse. Optional argument 'filename'
@@ -222,6 +235,9 @@ def daast_from_str(src, filename='<str>', args=None):
         sys.stderr.write("%s compiled with %d errors and %d warnings.\n" %
                      (filename, dt.errcnt, dt.warncnt))
         if dt.errcnt == 0:
+            if _cache_key is not None and dt.warncnt == 0:
+                from . import astcache
+                astcache.store(_cache_key, dt.program)
             return dt.program
     except SyntaxError as e:
         sys.stderr.write("%s:%d:%d: SyntaxError: %s" % (e.filename, e.lineno,
@@ -595,8 +611,9 @@ def enter_query(self):
         pass
 
     def leave_query(self, audit=False):
-        self.debug("Leaving query: " + str(self.current_query),
-                   self.current_query)
+        if debug_enabled():
+            self.debug("Leaving query: " + str(self.current_query),
+                       self.current_query)
         if audit and self.get_option('use_top_semantic', default=False):
             if self.current_parent is self.current_query:
                 self.audit_query(self.current_parent)
@@ -951,10 +968,11 @@ def visit_ClassDef(self, node):
                                node.body[:bodyidx] + node.body[(bodyidx+1):])
             else:
                 self.proc_body(node.body)
-            dbgstr = ["Process ", proc.name, " has names: "]
-            for n in proc._names.values():
-                dbgstr.append("%s: %s; " % (n, str(n.get_typectx())))
-            self.debug("".join(dbgstr))
+            if debug_enabled():
+                dbgstr = ["Process ", proc.name, " has names: "]
+                for n in proc._names.values():
+                    dbgstr.append("%s: %s; " % (n, str(n.get_typectx())))
+                self.debug("".join(dbgstr))
             self.pop_state()
             if proc.entry_point is None:
                 self.warn("Process %s missing '%s()' method." %
@@ -973,10 +991,11 @@ def visit_ClassDef(self, node):
             clsobj.bases = self.parse_bases(node, clsobj)
             self.current_block = clsobj.body
             self.body(node.body)
-            dbgstr = ["Class ", clsobj.name, " has names: "]
-            for n in clsobj._names.values():
-                dbgstr.append("%s: %s; " % (n, str(n.get_typectx())))
-            self.debug("".join(dbgstr))
+            if debug_enabled():
+                dbgstr = ["Class ", clsobj.name, " has names: "]
+                for n in clsobj._names.values():
+                    dbgstr.append("%s: %s; " % (n, str(n.get_typectx())))
+                self.debug("".join(dbgstr))
             self.pop_state()
 
     def visit_AsyncFunctionDef(self, node):
@@ -1029,10 +1048,11 @@ def visit_FunctionDef(self, node):
             if not self.is_in_setup():
                 self.signature(node.args)
             self.body(node.body)
-            dbgstr = [s.name, " has names: "]
-            for n in s._names.values():
-                dbgstr.append(("%s: %s; " % (n, str(n.get_typectx()))))
-            self.debug("".join(dbgstr))
+            if debug_enabled():
+                dbgstr = [s.name, " has names: "]
+                for n in s._names.values():
+                    dbgstr.append(("%s: %s; " % (n, str(n.get_typectx()))))
+                self.debug("".join(dbgstr))
             self.pop_state()
             self._dummy_process = None
 
@@ -1318,7 +1338,8 @@ def parse_branches_for_await(self, stmtobj, node):
                 break
             elif len(else_) == 1 and isinstance(else_[0], If):
                 node = else_[0]
-                self.debug("checking await branch {}".format(dump(node)))
+                if debug_enabled():
+                    self.debug("checking await branch {}".format(dump(node)))
                 if expr_check(KW_AWAIT_TIMEOUT, 0 ,1, node.test):
                     # A timeout branch
                     self.debug("found timeout branch.")
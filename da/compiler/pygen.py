@@ -27,7 +27,7 @@
 from ast import *
 from itertools import chain
 from . import dast, symtab
-from .utils import printd, printw, printe
+from .utils import printd, printw, printe, debug_enabled
 
 from pprint import pprint
 
@@ -95,58 +95,79 @@
 
 ########## Convenience methods for creating AST nodes: ##########
 
-def pyCall(func, args=[], keywords=[], starargs=None, kwargs=None):
+# Expression contexts carry no state, so a single shared instance of each is
+# used instead of allocating a new one for every generated node:
+_LOAD = Load()
+_STORE = Store()
+
+# The hottest helpers below bind the AST constructors they use as default
+# arguments, turning global lookups into local ones. These trailing parameters
+# are an implementation detail and must never be passed by callers.
+
+def pyCall(func, args=[], keywords=[], starargs=None, kwargs=None,
+           _Call=Call, _keyword=keyword):
     if isinstance(func, str):
         func = pyName(func)
-    ast = Call(func,
-               list(args),
-               [keyword(arg, val) for arg, val in keywords])
-    propagate_attributes(func, ast)
-    propagate_attributes(args, ast)
-    propagate_attributes([val for _, val in keywords], ast)
+    ast = _Call(func,
+                list(args),
+                [_keyword(arg, val) for arg, val in keywords])
+    _propagate = propagate_attributes
+    _propagate(func, ast)
+    _propagate(args, ast)
+    _propagate([val for _, val in keywords], ast)
     return ast
 
-def pyName(name, ctx=None):
-    return Name(name, Load() if ctx is None else ctx)
+def pyName(name, ctx=None, _Name=Name):
+    return _Name(name, _LOAD if ctx is None else ctx)
+
+if sys.version_info < (3, 8):
+    _NameConstant = NameConstant
+else:
+    # Since Python 3.8
+    _NameConstant = Constant
 
 def pyNone():
-    if sys.version_info < (3, 8):
-        return NameConstant(None)
-    else:
-        return Constant(None)
+    return _NameConstant(None)
 
 def pyTrue():
-    if sys.version_info < (3, 8):
-        return NameConstant(True)
-    else:
-        return Constant(True)
+    return _NameConstant(True)
 
 def pyFalse():
-    if sys.version_info < (3, 8):
-        return NameConstant(False)
-    return Constant(False)
+    return _NameConstant(False)
+
+if sys.version_info < (3, 8):
+    def pyConstant(value):
+        if isinstance(value, str):
+            return Str(value)
+        elif isinstance(value, bytes):
+            return Bytes(value)
+        else:
+            return Num(value)
+else:
+    # Since Python 3.8
+    pyConstant = Constant
 
 def pyNot(expr):
     ast = UnaryOp(Not(), expr)
     return propagate_attributes(expr, ast)
 
-def pyList(elts, ctx=None):
-    ast = List(elts, Load() if ctx is None else ctx)
+def pyList(elts, ctx=None, _List=List):
+    ast = _List(elts, _LOAD if ctx is None else ctx)
     return propagate_attributes(elts, ast)
 
 def pySet(elts, ctx=None):
     ast = Set(elts)
     return propagate_attributes(elts, ast)
 
-def pyTuple(elts, ctx=None):
-    ast = Tuple(elts, Load() if ctx is None else ctx)
+def pyTuple(elts, ctx=None, _Tuple=Tuple):
+    ast = _Tuple(elts, _LOAD if ctx is None else ctx)
     return propagate_attributes(elts, ast)
 
 def pySetC(elts):
     return pyCall("set", args=elts)
 
-def pySubscr(value, index, ctx=None):
-    ast = Subscript(value, index, Load() if ctx is None else ctx)
+def pySubscr(value, index, ctx=None, _Subscript=Subscript):
+    ast = _Subscript(value, index, _LOAD if ctx is None else ctx)
     return propagate_attributes((value, index), ast)
 
 def pySize(value):
@@ -158,16 +179,23 @@ def pyMin(value):
 def pyMax(value):
     return pyCall("max", [value])
 
-def pyAttr(name, attr, ctx=None):
+def pyAttr(name, attr, ctx=None, _Attribute=Attribute, _Name=Name):
     if isinstance(name, str):
-        ast = Attribute(Name(name, Load()), attr,
-                         Load() if ctx is None else ctx)
+        # e.g. `self.<attr>`: a fresh name has nothing to propagate.
+        return _Attribute(_Name(name, _LOAD), attr,
+                          _LOAD if ctx is None else ctx)
     else:
-        ast = Attribute(name, attr, Load() if ctx is None else ctx)
-    return propagate_attributes(ast.value, ast)
+        ast = _Attribute(name, attr, _LOAD if ctx is None else ctx)
+        return propagate_attributes(name, ast)
 
-def pyCompare(left, op, right):
-    ast = Compare(left, [op()], [right])
+# `da.pat.<name>`. The nodes can not be cached and shared since they receive
+# source locations later on, so they are just built directly:
+def pyPatAttr(name, _Attribute=Attribute, _Name=Name):
+    return _Attribute(_Attribute(_Name("da", _LOAD), "pat", _LOAD),
+                      name, _LOAD)
+
+def pyCompare(left, op, right, _Compare=Compare):
+    ast = _Compare(left, [op()], [right])
     return propagate_fields(ast)
 
 def pyLabel(name, block=False, timeout=None):
@@ -239,7 +267,10 @@ def pyFunctionDef(name, args=[], kwarg=None, body=[], decorator_list=[],
     ast = FunctionDef(name, arglist, list(body), list(decorator_list), returns)
     return ast
 
-def propagate_attributes(from_nodes, to_node):
+def propagate_attributes(from_nodes, to_node,
+                         _AST=AST, _getattr=getattr, _hasattr=hasattr,
+                         _isinstance=isinstance, _list=list,
+                         _sequence_types=(list, tuple, set)):
     """Propagates the 'prebody' and 'postbody' attributes.
 
     These attributes carry auxiliary function definitions/cleanup statements,
@@ -247,20 +278,21 @@ def propagate_attributes(from_nodes, to_node):
     a statement block) where injection is possible.
 
     """
-    if isinstance(to_node, AST):
-        if not (isinstance(from_nodes, list) or
-                isinstance(from_nodes, tuple) or
-                isinstance(from_nodes, set)):
+    if _isinstance(to_node, _AST):
+        if not _isinstance(from_nodes, _sequence_types):
             from_nodes = [from_nodes]
         for fro in from_nodes:
-            if (hasattr(fro, "prebody") and isinstance(fro.prebody, list)):
-                if not hasattr(to_node, "prebody"):
+            # Most nodes carry neither attribute, so fetch each one only once:
+            prebody = _getattr(fro, "prebody", None)
+            if _isinstance(prebody, _list):
+                if not _hasattr(to_node, "prebody"):
                     to_node.prebody = []
-                to_node.prebody.extend(fro.prebody)
-            if (hasattr(fro, "postbody") and isinstance(fro.postbody, list)):
-                if not hasattr(to_node, "postbody"):
+                to_node.prebody.extend(prebody)
+            postbody = _getattr(fro, "postbody", None)
+            if _isinstance(postbody, _list):
+                if not _hasattr(to_node, "postbody"):
                     to_node.postbody = []
-                to_node.postbody.extend(fro.postbody)
+                to_node.postbody.extend(postbody)
     return to_node
 
 def propagate_fields(node):
@@ -275,6 +307,74 @@ def propagate_fields(node):
             propagate_attributes(getattr(node, f), node)
     return node
 
+########## Per-type code generation tables: ##########
+
+def _pattern_call(name, args=[]):
+    return pyCall(func=pyPatAttr(name), args=args)
+
+def _gen_free_pattern(gen, node):
+    val = Str(node.value.name) if node.value is not None else pyNone()
+    return _pattern_call("FreePattern", [val])
+
+def _gen_bound_pattern(gen, node):
+    return _pattern_call("BoundPattern", [Str(node.unique_name)])
+
+def _gen_constant_pattern(gen, node):
+    if type(node.value) is dast.SelfExpr:
+        # We have to special case the 'self' expr here:
+        return _pattern_call("SelfPattern")
+    else:
+        return _pattern_call("ConstantPattern", [gen.visit(node.value)])
+
+def _gen_sequence_pattern(gen, node):
+    val = pyList([gen.visit(v) for v in node.value])
+    return _pattern_call(type(node).__name__, [val])
+
+# Maps each pattern element type to a function `(generator, node)` returning
+# the Python AST that constructs the runtime pattern object:
+PatternElementMap = {
+    dast.FreePattern     : _gen_free_pattern,
+    dast.BoundPattern    : _gen_bound_pattern,
+    dast.ConstantPattern : _gen_constant_pattern,
+    dast.TuplePattern    : _gen_sequence_pattern,
+    dast.ListPattern     : _gen_sequence_pattern
+}
+
+def _gen_prod_comp(gen, node, elem, generators):
+    #1. functools.reduce(operator.mul,lis)
+    #2. eval('*'.join(str(item) for item in list))
+    gen.importSet.add(('functools',))
+    gen.importSet.add(('operator',))
+    return pyCall(func=pyAttr("functools", "reduce"),
+                  args=[pyAttr("operator","mul"), ListComp(elem, generators)])
+
+def _gen_aggregate_comp(gen, node, elem, generators):
+    return pyCall(GenCompMap[type(node)],
+                  args=[GeneratorExp(elem, generators)])
+
+# Maps each comprehension type to a function `(generator, node, elem,
+# generators)` returning the Python AST for the comprehension:
+ComprehensionMap = {
+    dast.SetCompExpr   : lambda gen, node, elem, gens: SetComp(elem, gens),
+    dast.ListCompExpr  : lambda gen, node, elem, gens: ListComp(elem, gens),
+    dast.LenCompExpr   : lambda gen, node, elem, gens:
+                             pyCall("len", args=[ListComp(elem, gens)]),
+    dast.TupleCompExpr : _gen_aggregate_comp,
+    dast.MinCompExpr   : _gen_aggregate_comp,
+    dast.MaxCompExpr   : _gen_aggregate_comp,
+    dast.SumCompExpr   : _gen_aggregate_comp,
+    dast.PrdCompExpr   : _gen_prod_comp,
+    dast.GeneratorExpr : lambda gen, node, elem, gens: GeneratorExp(elem, gens)
+}
+
+# Comprehensions without generators degenerate to
+# `IfExp(test, single([elem]), empty([]))`:
+DegenerateComprehensionMap = {
+    dast.SetCompExpr   : (pySet, pySetC),
+    dast.ListCompExpr  : (pyList, pyList),
+    dast.TupleCompExpr : (pyTuple, pyTuple)
+}
+
 class MaxLineAndColFinder(NodeVisitor):
     """Find the number of the last line and its maximum column offset under a
     given tree."""
@@ -346,6 +446,13 @@ def is_all_wildcards(targets):
             return False
     return True
 
+# Expression types that translate to a single node and never have a prebody or
+# postbody to propagate:
+LeafExprTypes = frozenset({
+    dast.ConstantExpr, dast.SelfExpr, dast.TrueExpr, dast.FalseExpr,
+    dast.NoneExpr, dast.EllipsisExpr
+})
+
 class PythonGeneratorException(Exception): pass
 
 def translate(distalgo_ast, filename="", options=None):
@@ -413,7 +520,28 @@ def reset(self):
         self.postambles = list()
         self.pattern_generator = None
 
-    def visit(self, node):
+    @classmethod
+    def get_visitor(cls, nodetype):
+        """Returns the visit method (as a plain function) for `nodetype`.
+
+        Method lookups are memoized per generator class, so subclasses that
+        override visit methods get their own table.
+
+        """
+        visitors = cls.__dict__.get('_visitors')
+        if visitors is None:
+            visitors = dict()
+            cls._visitors = visitors
+        visitor = visitors.get(nodetype)
+        if visitor is None:
+            visitor = getattr(cls, "visit_" + nodetype.__name__,
+                              cls.generic_visit)
+            visitors[nodetype] = visitor
+        return visitor
+
+    def visit(self, node, _Statement=dast.Statement,
+              _copy_location=copy_location,
+              _propagate_attributes=propagate_attributes):
         """Generic visit method.
 
         If the Incrementalization interface generated code for this node, as
@@ -424,33 +552,40 @@ def visit(self, node):
         if node is None:
             return None
 
+        if type(node) in LeafExprTypes and not hasattr(node, "ast_override"):
+            # Fast path: leaf expressions never carry pre or post bodies.
+            self.current_node = node
+            res = self.get_visitor(type(node))(self, node)
+            return _copy_location(res, node)
+
         assert isinstance(node, dast.DistNode)
         self.current_node = node
         if hasattr(node, "ast_override"):
             res = node.ast_override
         else:
-            res = super().visit(node)
+            res = self.get_visitor(type(node))(self, node)
 
-        if isinstance(node, dast.Statement):
+        if isinstance(node, _Statement):
             assert isinstance(res, list)
             # This is a statement block, propagate line number info:
             if len(res) > 0:
-                copy_location(res[0], node)
-                propagate_attributes(node, res[0])
+                _copy_location(res[0], node)
+                _propagate_attributes(node, res[0])
             return res
         else:
             assert isinstance(res, AST)
             # This is an expression, pass on pre and post bodies:
-            copy_location(res, node)
-            return propagate_attributes(node, res)
+            _copy_location(res, node)
+            return _propagate_attributes(node, res)
 
     def _expand_block_attr(self, attr, from_block, to_block):
         if self.disable_body_expansion:
             to_block.extend(from_block)
         else:
             for stmt in from_block:
-                if hasattr(stmt, attr):
-                    new_block = clear_location_attrs(getattr(stmt, attr))
+                new_block = getattr(stmt, attr, None)
+                if new_block:
+                    clear_location_attrs(new_block)
                     copy_location(new_block[0], stmt)
                     to_block.extend(new_block)
         return to_block
@@ -463,17 +598,26 @@ def body(self, body, res=None):
             if stmt.label is not None:
                 res.append(copy_location(pyLabel(stmt.label), stmt))
             block = self.visit(stmt)
-            if block is not None:
+            if block is None:
+                printe("None result from %s" % str(stmt))
+            elif (len(block) == 1 and not self.disable_body_expansion and
+                  not hasattr(block[0], 'prebody') and
+                  not hasattr(block[0], 'postbody')):
+                # Common case: a single statement with nothing to splice.
+                res.append(block[0])
+            else:
                 self._expand_block_attr('prebody', block, res)
                 res.extend(block)
                 self._expand_block_attr('postbody', block, res)
-            else:
-                printe("None result from %s" % str(stmt))
         fixup_locations_in_block(res)
         return res
 
     def visit_Program(self, node):
         self.module_args = node._compiler_options
+        # Processes must be translated in order and by this one generator: the
+        # pattern preambles and `import` sets they produce accumulate on
+        # `self`, and process bodies refer to shared `NamedVar` objects of the
+        # module scope, so they can not be farmed out independently.
         mainbody = self.body(node.body)
         if node.nodecls is not None:
             # `nodecls` is the `Node_` process:
@@ -497,12 +641,12 @@ def visit_Program(self, node):
             return [Module(importList+fromImportList+body)]
 
     def generate_config(self, node):
-        return Assign([pyName(CONFIG_OBJECT_NAME, Store())],
+        return Assign([pyName(CONFIG_OBJECT_NAME, _STORE)],
                       Dict([Str(key) for key, _ in node.configurations],
                            [self.visit(val) for _, val in node.configurations]))
 
     def generate_event_def(self, node):
-        evtype = pyAttr(pyAttr("da", "pat"), node.type.__name__)
+        evtype = pyPatAttr(node.type.__name__)
         name = Str(node.name)
         history = self.history_stub(node)
         pattern = self.visit(node.pattern)
@@ -516,7 +660,7 @@ def generate_event_def(self, node):
         if len(node.timestamps) > 0:
             timestamps = pyList([self.visit(s) for s in node.timestamps])
         handlers = pyList([pyAttr("self", h.name) for h in node.handlers])
-        return pyCall(func=pyAttr(pyAttr("da", "pat"), "EventPattern"),
+        return pyCall(func=pyPatAttr("EventPattern"),
                       args=[evtype, name, pattern],
                       keywords=[("sources", sources),
                                 ("destinations", destinations),
@@ -525,7 +669,7 @@ def generate_event_def(self, node):
                                 ("handlers", handlers)])
 
     def history_initializers(self, node):
-        return [pyAssign(targets=[pyAttr("self", evt.name, Store())],
+        return [pyAssign(targets=[pyAttr("self", evt.name, _STORE)],
                          value=pyList([]))
                 for evt in node.events if evt.record_history]
 
@@ -632,7 +776,7 @@ def _generate_setup(self, node, fd):
                    keywords=superargs)))
         fd.body.extend([
             Assign(targets=[pyAttr(pyAttr("self", STATE_ATTR_NAME),
-                                   name, Store())],
+                                   name, _STORE)],
                    value=pyName(name))
             for name in node.parent.ordered_names
         ])
@@ -642,7 +786,7 @@ def visit_Function(self, node):
         fd.name = node.name
         fd.args = self.visit(node.args)
         fd.body = []
-        if isinstance(node.parent, dast.Process):
+        if type(node.parent) is dast.Process:
             if node.name == "setup":
                 self._generate_setup(node, fd)
             if node not in node.parent.staticmethods:
@@ -679,7 +823,7 @@ def visit_SubscriptExpr(self, node):
         ctx = self.current_context
         self.current_context = Load
         val = self.visit(node.value)
-        if isinstance(node.index, dast.SliceExpr) or isinstance(node.index, dast.ExtSliceExpr):
+        if type(node.index) in (dast.SliceExpr, dast.ExtSliceExpr):
             idx = self.visit(node.index)
         else:
             if sys.version_info < (3, 9):
@@ -695,7 +839,7 @@ def visit_ExtSliceExpr(self,node):
         if sys.version_info < (3, 9):
             ast = ExtSlice(dims)
         else:
-            ast = Tuple(dims, Load())
+            ast = Tuple(dims, _LOAD)
         return propagate_attributes(dims, ast)
 
     def visit_PythonExpr(self, node):
@@ -723,16 +867,7 @@ def visit_EllipsisExpr(self, node):
             return Constant(builtins.Ellipsis)
 
     def visit_ConstantExpr(self, node):
-        if sys.version_info < (3, 8):
-            if isinstance(node.value, str):
-                return Str(node.value)
-            elif isinstance(node.value, bytes):
-                return Bytes(node.value)
-            else:
-                return Num(node.value)
-        else:
-            # Since Python 3.8
-            return Constant(node.value)
+        return pyConstant(node.value)
 
     def visit_SelfExpr(self, node):
         return pyAttr("self", "_id")
@@ -780,8 +915,9 @@ def visit_IfExpr(self, node):
                     self.visit(node.orbody))
         return propagate_attributes((ast.test, ast.body, ast.orelse), ast)
 
-    def visit_CallExpr(self, node):
-        return pyCall(self.visit(node.func),
+    def generate_call(self, func, node):
+        """Generates a call to `func` with the arguments of call node `node`."""
+        return pyCall(func,
                      [self.visit(a) for a in node.args],
                      [(key, self.visit(value)) for key, value in node.keywords],
                      self.visit(node.starargs)
@@ -789,23 +925,14 @@ def visit_CallExpr(self, node):
                      self.visit(node.kwargs)
                      if node.kwargs is not None else None)
 
+    def visit_CallExpr(self, node):
+        return self.generate_call(self.visit(node.func), node)
+
     def visit_ApiCallExpr(self, node):
-        return pyCall(pyAttr("da", node.func),
-                     [self.visit(a) for a in node.args],
-                     [(key, self.visit(value)) for key, value in node.keywords],
-                     self.visit(node.starargs)
-                     if node.starargs is not None else None,
-                     self.visit(node.kwargs)
-                     if node.kwargs is not None else None)
+        return self.generate_call(pyAttr("da", node.func), node)
 
     def visit_BuiltinCallExpr(self, node):
-        return pyCall(pyAttr("self", node.func),
-                     [self.visit(a) for a in node.args],
-                     [(key, self.visit(value)) for key, value in node.keywords],
-                     self.visit(node.starargs)
-                     if node.starargs is not None else None,
-                     self.visit(node.kwargs)
-                     if node.kwargs is not None else None)
+        return self.generate_call(pyAttr("self", node.func), node)
 
     visit_SetupExpr = visit_StartExpr = visit_ConfigExpr = visit_BuiltinCallExpr
 
@@ -874,12 +1001,11 @@ def visit_QuantifiedExpr(self, node):
             for cond in comp.ifs:
                 body.append(pyIf(cond, [], []))
                 body = body[0].body
-        postbody = []
         ifcond = self.visit(node.predicate)
+        # Only statements are ever given a postbody, so the predicate can only
+        # carry a prebody:
         if hasattr(ifcond, "prebody"):
             body.extend(ifcond.prebody)
-        if hasattr(ifcond, "postbody"):
-            postbody.extend(cnode.postbody)
 
         if node.operator is dast.UniversalOp:
             ifcond = pyNot(ifcond)
@@ -887,7 +1013,6 @@ def visit_QuantifiedExpr(self, node):
         else:                   # ExistentialExpr
             ifbody = [pyReturn(pyTrue())]
         body.append(pyIf(ifcond, ifbody, []))
-        body.extend(postbody)
         if node.operator is dast.UniversalOp:
             funcbody.append(pyReturn(pyTrue()))
         else:
@@ -913,7 +1038,7 @@ def visit_QuantifiedExpr(self, node):
         if len(nameset) > 0:
             # Back patch nonlocal statement
             if not isinstance(node.scope, dast.ComprehensionExpr):
-                if not isinstance(node.statement.parent, dast.Program):
+                if type(node.statement.parent) is not dast.Program:
                     decl = Nonlocal([nv.name for nv in nameset])
                 else:
                     decl = Global([nv.name for nv in nameset])
@@ -922,7 +1047,7 @@ def visit_QuantifiedExpr(self, node):
             # Assignment needed to ensure all vars are bound at this point
             if is_top_level_query:
                 ast.prebody.insert(
-                    0, Assign(targets=[pyName(nv.name, Store())
+                    0, Assign(targets=[pyName(nv.name, _STORE)
                                        for nv in nameset],
                               value=pyNone()))
 
@@ -933,7 +1058,8 @@ def visit_QuantifiedExpr(self, node):
         return ast
 
     def visit_ComprehensionExpr(self, node):
-        printd("Entering comprehension " + str(node))
+        if debug_enabled():
+            printd("Entering comprehension " + str(node))
         if self.pattern_generator is None:
             self.pattern_generator = PatternComprehensionGenerator()
             is_top_level_query = True
@@ -979,40 +1105,20 @@ def visit_ComprehensionExpr(self, node):
             else:
                 elem = self.visit(node.elem)
                 if len(generators) > 0:
-                    if isinstance(node, dast.SetCompExpr):
-                        ast = SetComp(elem, generators)
-                    elif isinstance(node, dast.ListCompExpr):
-                        ast = ListComp(elem, generators)
-                    elif isinstance(node, dast.LenCompExpr):
-                        ast = pyCall("len", args=[ListComp(elem, generators)])
-                    elif type(node) in GenCompMap:
-                        ast = pyCall(GenCompMap[type(node)], args=[GeneratorExp(elem, generators)])
-                    elif isinstance(node, dast.PrdCompExpr):
-                        #1. functools.reduce(operator.mul,lis)
-                        #2. eval('*'.join(str(item) for item in list))
-                        self.importSet.add(('functools',))
-                        self.importSet.add(('operator',))
-                        ast = pyCall(func=pyAttr("functools", "reduce"), args=[pyAttr("operator","mul"), ListComp(elem, generators)])
-                    elif isinstance(node, dast.GeneratorExpr):
-                        ast = GeneratorExp(elem, generators)
-                    else:
+                    handler = ComprehensionMap.get(type(node))
+                    if handler is None:
                         self.error("Unknown expression", node)
                         return None
+                    ast = handler(self, node, elem, generators)
                 else:
                     # No generators, degenerate to IfExp:
-                    if isinstance(node, dast.SetCompExpr):
+                    ctors = DegenerateComprehensionMap.get(type(node))
+                    if ctors is not None:
+                        single, empty = ctors
                         ast = IfExp(test,
-                                    propagate_fields(pySet([elem])),
-                                    pySetC([]))
-                    elif isinstance(node, dast.ListCompExpr):
-                        ast = IfExp(test,
-                                    propagate_fields(pyList([elem])),
-                                    pyList([]))
-                    elif isinstance(node, dast.TupleCompExpr):
-                        ast = IfExp(test,
-                                    propagate_fields(pyTuple([elem])),
-                                    pyTuple([]))
-                    elif isinstance(node, dast.GeneratorExpr):
+                                    propagate_fields(single([elem])),
+                                    empty([]))
+                    elif type(node) is dast.GeneratorExpr:
                         # Impossible:
                         self.error("Illegal generator expression.", node)
                         return None
@@ -1023,13 +1129,15 @@ def visit_ComprehensionExpr(self, node):
 
         finally:
             if is_top_level_query:
-                printd("Leaving toplevel " + str(node))
+                if debug_enabled():
+                    printd("Leaving toplevel " + str(node))
                 self.pattern_generator = None
             else:
                 # We need to restore the pattern state because comprehensions
                 # does not bind witness values outside its scope:
                 self.pattern_generator.pop_state()
-                printd("Leaving comprehension " + str(node))
+                if debug_enabled():
+                    printd("Leaving comprehension " + str(node))
 
     visit_GeneratorExpr = visit_ComprehensionExpr
     visit_SetCompExpr = visit_ComprehensionExpr
@@ -1072,21 +1180,7 @@ def visit_ArithmeticExpr(self, node):
     visit_UnaryExpr = visit_ArithmeticExpr
 
     def visit_PatternElement(self, node):
-        if type(node) is dast.FreePattern:
-            val = Str(node.value.name) if node.value is not None else pyNone()
-        elif type(node) is dast.BoundPattern:
-            val = Str(node.unique_name)
-        elif type(node) is dast.ConstantPattern:
-            if isinstance(node.value, dast.SelfExpr):
-                # We have to special case the 'self' expr here:
-                return pyCall(func=pyAttr(pyAttr("da", "pat"), "SelfPattern"))
-            else:
-                val = self.visit(node.value)
-        else:
-            val = pyList([self.visit(v) for v in node.value])
-
-        return pyCall(func=pyAttr(pyAttr("da", "pat"), type(node).__name__),
-                      args=[val])
+        return PatternElementMap[type(node)](self, node)
 
     visit_FreePattern = visit_PatternElement
     visit_BoundPattern = visit_PatternElement
@@ -1097,7 +1191,7 @@ def visit_PatternElement(self, node):
     def visit_PatternExpr(self, node):
         if node.name not in self.processed_patterns:
             patast = self.visit(node.pattern)
-            ast = pyAssign([pyName(node.name, Store())], patast)
+            ast = pyAssign([pyName(node.name, _STORE)], patast)
             self.preambles.append(ast)
             self.processed_patterns.add(node.name)
         return pyName(node.name)
@@ -1116,7 +1210,7 @@ def visit_LambdaExpr(self, node):
         return Lambda(args, self.visit(node.body))
 
     def visit_NamedVar(self, node):
-        if isinstance(node.scope, dast.Process):
+        if type(node.scope) is dast.Process:
             if node.name in node.scope.methodnames:
                 return pyAttr("self", node.name,
                               self.current_context())
@@ -1194,17 +1288,18 @@ def visit_TryFinallyStmt(self, node):
     # 'await' and 'if await':
     def visit_AwaitStmt(self, node):
         def INCGRD():
-            return pyAugAssign(pyName(node.unique_label, Store()), Add, Num(1))
+            return pyAugAssign(pyName(node.unique_label, _STORE), Add, Num(1))
         def DEDGRD():
-            return pyAugAssign(pyName(node.unique_label, Store()), Sub, Num(1))
+            return pyAugAssign(pyName(node.unique_label, _STORE), Sub, Num(1))
         conds = []
         body = [INCGRD()]       # body of the main while loop
-        last = body
         last_lineno, max_colno = None, None
+        # (condition, body, source node) of each branch, in order:
+        branches = []
         timeout_branches = []
         whilenode = pyWhile(pyCompare(pyName(node.unique_label), Eq, Num(0)),
                             body, [])
-        main = [pyAssign([pyName(node.unique_label, Store())], Num(0))]
+        main = [pyAssign([pyName(node.unique_label, _STORE)], Num(0))]
         main.append(whilenode)
         for br in node.branches:
             if br.condition is not None:
@@ -1218,10 +1313,7 @@ def DEDGRD():
             ifbody = self.body(br.body)
             ifbody.append(INCGRD())
             last_lineno, max_colno = fixup_locations_in_block(ifbody)
-            brnode = pyIf(cond, ifbody, [])
-            copy_location(brnode, br)
-            last.append(brnode)
-            last = brnode.orelse
+            branches.append((cond, ifbody, br))
         if node.timeout is not None:
             main.append(pyExpr(pyCall(pyAttr("self", "_timer_start"))))
             if not timeout_branches:
@@ -1229,20 +1321,28 @@ def DEDGRD():
                 # one here:
                 cond = pyAttr("self", "_timer_expired")
                 ifbody = [INCGRD()]
-                brnode = pyIf(cond, ifbody, [])
                 if last_lineno is not None:
                     ifbody[0].lineno, ifbody[0].col_offset = last_lineno, max_colno
                 fixup_locations_in_block(ifbody)
-                last.append(brnode)
-                last = brnode.orelse
+                branches.append((cond, ifbody, None))
         # Label call must come after the If tests:
-        last.append(pyLabel(node.label, block=True,
+        last = [pyLabel(node.label, block=True,
                         timeout=(self.visit(node.timeout)
-                                 if node.timeout is not None else None)))
-        last.append(DEDGRD())
+                                 if node.timeout is not None else None)),
+                DEDGRD()]
         if last_lineno is not None:
             last[0].lineno, last[0].col_offset = last_lineno, max_colno
         fixup_locations_in_block(last)
+        # Chain the branches bottom-up, so that each `If` is created with its
+        # final `orelse`. This must remain an if-elif chain: branch conditions
+        # are evaluated lazily and in order, and branch bodies may `break`,
+        # `continue` or `return` out of the enclosing function:
+        for cond, ifbody, br in reversed(branches):
+            brnode = pyIf(cond, ifbody, last)
+            if br is not None:
+                copy_location(brnode, br)
+            last = [brnode]
+        body.extend(last)
         if node.is_in_loop:
             propagate_continue \
                 = pyIf(test=pyCompare(pyName(node.unique_label), NotEq, Num(2)),
@@ -1262,9 +1362,9 @@ def DEDGRD():
     # 'while await':
     def visit_LoopingAwaitStmt(self, node):
         def INCGRD():
-            return pyAugAssign(pyName(node.unique_label, Store()), Add, Num(1))
+            return pyAugAssign(pyName(node.unique_label, _STORE), Add, Num(1))
         def DEDGRD():
-            return pyAugAssign(pyName(node.unique_label, Store()), Sub, Num(1))
+            return pyAugAssign(pyName(node.unique_label, _STORE), Sub, Num(1))
         conds = []
         timeout_branches = []
         body = [INCGRD()]       # body of the main while loop
@@ -1310,7 +1410,7 @@ def DEDGRD():
         fixup_locations_in_block(last)
         whilenode = pyWhile(pyCompare(pyName(node.unique_label), Eq, Num(0)),
                             body, [])
-        main = [pyAssign([pyName(node.unique_label, Store())], Num(0))]
+        main = [pyAssign([pyName(node.unique_label, _STORE)], Num(0))]
         if node.timeout is not None:
             main.append(pyExpr(pyCall(pyAttr("self", "_timer_start"))))
         main.append(whilenode)
@@ -1346,8 +1446,10 @@ def visit_YieldFromStmt(self, node):
 
     def visit_WithStmt(self, node):
         items = []
+        context_exprs = []
         for item in node.items:
             context_expr = self.visit(item[0])
+            context_exprs.append(context_expr)
             if item[1] is not None:
                 self.current_context = Store
                 optional_vars = self.visit(item[1])
@@ -1357,7 +1459,7 @@ def visit_WithStmt(self, node):
             items.append(withitem(context_expr, optional_vars))
         body = self.body(node.body)
         ast = With(items, body)
-        return [propagate_attributes([e.context_expr for e in items], ast)]
+        return [propagate_attributes(context_exprs, ast)]
 
     def visit_RaiseStmt(self, node):
         ast = Raise(self.visit(node.expr), self.visit(node.cause))
@@ -1420,20 +1522,24 @@ def history_stub(self, node):
             return pyNone()
 
     def visit_Event(self, node):
-        return pyAttr(pyAttr("da", "pat"), node.type.__name__)
+        return pyPatAttr(node.type.__name__)
+
+    def generate_label_set(self, labels):
+        # A tuple of string constants is loaded as a single constant, whereas
+        # a set display is built element by element:
+        if labels is None:
+            return pyNone()
+        return pyCall(pyName("frozenset"),
+                      [pyTuple([Str(l) for l in sorted(labels)])])
 
     def visit_EventHandler(self, node):
         stmts = self.visit_Function(node)
         stmts.append(pyAssign(
-            [pyAttr(node.name, "_labels", Store())],
-            (pyNone() if node.labels is None else
-               pyCall(pyName("frozenset"),
-                      [pySet([Str(l) for l in node.labels])]))))
+            [pyAttr(node.name, "_labels", _STORE)],
+            self.generate_label_set(node.labels)))
         stmts.append(pyAssign(
-            [pyAttr(node.name, "_notlabels", Store())],
-            (pyNone() if node.notlabels is None else
-               pyCall(pyName("frozenset"),
-                      [pySet([Str(l) for l in node.notlabels])]))))
+            [pyAttr(node.name, "_notlabels", _STORE)],
+            self.generate_label_set(node.notlabels)))
         return stmts
 
 class PatternComprehensionGenerator(PythonGenerator):
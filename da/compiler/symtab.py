@@ -24,6 +24,7 @@
 
 import ast
 import sys
+import threading
 import importlib.util
 
 from . import dast
@@ -32,6 +33,10 @@
 
 # all DistAlgo modules parsed so far:
 modules = dict()
+# Marks the names in `modules` that could not be loaded:
+_MISSING = object()
+# Guards `modules`; reentrant since parsing a module resolves its imports:
+_modules_lock = threading.RLock()
 
 class Resolver(CompilerMessagePrinter):
     """Finds definitions for names and attributes."""
@@ -73,21 +78,29 @@ def _get_ast_for_module(self, name):
         """Given a module `name`, return an AST representation of the source."""
         if name is None:
             return None
-        if name in modules:
-            return modules[name]
-        try:
-            spec = importlib.util.find_spec(name)
-            if spec is None:
+        with _modules_lock:
+            mod = modules.get(name)
+            if mod is _MISSING:
                 raise ResolverException(
-                    "unable to find source file for module '{}'".format(name))
-            src = spec.loader.get_source(name)
-        except Exception as e:
-            raise ResolverException("unable to load module '{}'".format(name)) \
-                from e
-        mod = self._daast_from_str(src, filename=spec.origin, package=name)
-        assert isinstance(mod, dast.Program)
-        modules[name] = mod
-        return mod
+                    "unable to load module '{}'".format(name))
+            elif mod is not None:
+                return mod
+            try:
+                spec = importlib.util.find_spec(name)
+                if spec is None:
+                    raise ResolverException(
+                        "unable to find source file for module '{}'"
+                        .format(name))
+                src = spec.loader.get_source(name)
+            except Exception as e:
+                # Remember the failure so we don't search `sys.path` again:
+                modules[name] = _MISSING
+                raise ResolverException(
+                    "unable to load module '{}'".format(name)) from e
+            mod = self._daast_from_str(src, filename=spec.origin, package=name)
+            assert isinstance(mod, dast.Program)
+            modules[name] = mod
+            return mod
 
     def find_process_definiton(self, expr):
         if isinstance(expr, dast.NameExpr):
@@ -101,11 +114,7 @@ def find_process_definiton(self, expr):
             elif isinstance(defstmt, dast.Process):
                 return defstmt
             elif isinstance(defstmt, dast.ImportFromStmt):
-                orig_name = name.name
-                for alias in defstmt.items:
-                    if alias.name == name.name or alias.asname == name.name:
-                        orig_name = alias.name
-                        break
+                orig_name = defstmt.original_name(name.name)
                 mod_name = self._resolve_relative_import(defstmt)
                 mod = self._get_ast_for_module(mod_name)
                 for procdef in mod.processes:
@@ -129,91 +138,36 @@ def find_process_definiton(self, expr):
             raise ResolverException('unsupported expression type {}'.format(expr))
 
     def _find_definitions_for_attr(self, expr):
+        # Walk down to the head of the attribute chain, then resolve the chain
+        # from left to right:
+        attrs = []
+        while isinstance(expr, dast.AttributeExpr):
+            attrs.append(expr)
+            expr = expr.value
         if isinstance(expr, dast.NameExpr):
-            name = expr.value
-            assert isinstance(name, dast.NamedVar)
-            defstmt = name.last_assignment_before(expr)
-
-            if defstmt is None:
-                raise ResolverException(
-                    "unable to find definition for '{}'".format(name.name), expr)
-
-            elif isinstance(defstmt, dast.NameScope):
-                return defstmt
-
-            elif isinstance(defstmt, dast.ImportFromStmt):
-                orig_name = name.name
-                for alias in defstmt.items:
-                    if alias.name == name.name or alias.asname == name.name:
-                        orig_name = alias.name
-                        break
-                mod_name = self._resolve_relative_import(defstmt)
-                mod = self._get_ast_for_module(mod_name)
-                nobj = mod.find_name(orig_name)
-                if nobj:
-                    for stmt, _ in reversed(nobj.assignments):
-                        if isinstance(stmt, dast.NameScope):
-                            return stmt
-                raise ResolverException(
-                    'unable to find definition for {} in module {}'
-                    .format(orig_name, mod_name), expr)
-
-            elif isinstance(defstmt, dast.ImportStmt):
-                # first check if this name is an alias..
-                orig_name = None
-                for alias in defstmt.items:
-                    if alias.asname == name.name:
-                        orig_name = alias.name
-                if orig_name:
-                    # it's an alias, and since it's an ImportStmt, orig_name can
-                    # not be a relative name, so just load the aliased module
-                    return self._get_ast_for_module(orig_name)
-
-                # ..otherwise, must find all imports with 'name' as first
-                # component...
-                imps = [defstmt]
-                last = defstmt
-                while True:
-                    last = name.last_assignment_before(last)
-                    if not last:
-                        break
-                    elif isinstance(last, dast.ImportStmt):
-                        imps.append(last)
-                    # we can ignore any other types of assignments since they
-                    # are guaranteed to be irrelevant
-
-                # ... and gather all modules names that has name.name as first
-                # component:
-                candidates = []
-                for stmt in imps:
-                    for alias in stmt.items:
-                        if alias.name.split('.')[0] == name.name:
-                            candidates.append(alias.name)
-                return (1, candidates)
-
-            else:
-                raise ResolverException('unsupported definition type {}'
-                                        .format(type(defstmt)), defstmt)
-
-        elif isinstance(expr, dast.AttributeExpr):
-            defs = self._find_definitions_for_attr(expr.value)
+            defs = self._find_definitions_for_name(expr)
+        else:
+            defs = None
+        for expr in reversed(attrs):
             if isinstance(defs, dast.NameScope):
                 nobj = defs.find_name(expr.attr)
-                if nobj:
-                    for stmt, _ in reversed(nobj.assignments):
-                        if isinstance(stmt, dast.NameScope):
-                            return stmt
-                raise ResolverException(
-                    "unable to find definition for '{}'".format(expr.text_repr))
+                scopes = [stmt for stmt, _ in nobj.assignments
+                          if isinstance(stmt, dast.NameScope)] if nobj else []
+                if not scopes:
+                    raise ResolverException(
+                        "unable to find definition for '{}'"
+                        .format(expr.text_repr))
+                defs = scopes[-1]
             elif isinstance(defs, tuple):
                 prefix_len, defs = defs
                 candidates = []
                 for name in defs:
                     parts = name.split('.')
-                    if len(parts) > prefix_len and parts[prefix_len] == expr.attr:
+                    if (len(parts) > prefix_len and
+                            parts[prefix_len] == expr.attr):
                         candidates.append(name)
                 if len(candidates) > 1:
-                    return (prefix_len + 1, candidates)
+                    defs = (prefix_len + 1, candidates)
                 elif len(candidates) == 1:
                     # only one candidate left, check to see if we have the full
                     # module name:
@@ -221,10 +175,10 @@ def _find_definitions_for_attr(self, expr):
                     parts = name.split('.')
                     if len(parts) == prefix_len + 1:
                         # we have full module name, so load it:
-                        return self._get_ast_for_module(name)
+                        defs = self._get_ast_for_module(name)
                     else:
                         # otherwise, pass it on:
-                        return (prefix_len + 1, candidates)
+                        defs = (prefix_len + 1, candidates)
                 else:
                     raise ResolverException(
                         "unable to find definition for '{}'"
@@ -233,4 +187,64 @@ def _find_definitions_for_attr(self, expr):
                 raise ResolverException(
                     "unsupported definition type {} for {}"
                     .format(defs, expr.value))
+        return defs
+
+    def _find_definitions_for_name(self, expr):
+        name = expr.value
+        assert isinstance(name, dast.NamedVar)
+        defstmt = name.last_assignment_before(expr)
 
+        if defstmt is None:
+            raise ResolverException(
+                "unable to find definition for '{}'".format(name.name), expr)
+
+        elif isinstance(defstmt, dast.NameScope):
+            return defstmt
+
+        elif isinstance(defstmt, dast.ImportFromStmt):
+            orig_name = defstmt.original_name(name.name)
+            mod_name = self._resolve_relative_import(defstmt)
+            mod = self._get_ast_for_module(mod_name)
+            nobj = mod.find_name(orig_name)
+            if nobj:
+                for stmt, _ in reversed(nobj.assignments):
+                    if isinstance(stmt, dast.NameScope):
+                        return stmt
+            raise ResolverException(
+                'unable to find definition for {} in module {}'
+                .format(orig_name, mod_name), expr)
+
+        elif isinstance(defstmt, dast.ImportStmt):
+            # first check if this name is an alias..
+            orig_name = None
+            for alias in defstmt.items:
+                if alias.asname == name.name:
+                    orig_name = alias.name
+            if orig_name:
+                # it's an alias, and since it's an ImportStmt, orig_name can
+                # not be a relative name, so just load the aliased module
+                return self._get_ast_for_module(orig_name)
+
+            # ..otherwise, must find all imports with 'name' as first
+            # component...
+            imps = [defstmt]
+            # we can ignore any other types of assignments since they are
+            # guaranteed to be irrelevant. A statement importing several
+            # submodules of 'name' assigns it once for each of them:
+            for stmt in reversed(name.assignments_before(defstmt)):
+                if isinstance(stmt, dast.ImportStmt) and \
+                   not any(stmt is imp for imp in imps):
+                    imps.append(stmt)
+
+            # ... and gather all modules names that has name.name as first
+            # component:
+            candidates = []
+            for stmt in imps:
+                for alias in stmt.items:
+                    if alias.name.split('.')[0] == name.name:
+                        candidates.append(alias.name)
+            return (1, candidates)
+
+        else:
+            raise ResolverException('unsupported definition type {}'
+                                    .format(type(defstmt)), defstmt)
@@ -22,21 +22,21 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import io
 import os
 import os.path
 import ast
 import sys
+import stat
 import time
 import argparse
 
 from .. import __version__
 from ..importer import da_cache_from_source
-from .utils import is_valid_debug_level, set_debug_level, to_source, to_file
+from .utils import DB_ERROR, DB_DEBUG, set_debug_level, to_source, to_file
 from .parser import daast_from_file
 from .parser import daast_from_str
 from .pygen import PythonGenerator
-from .incgen import gen_inc_module
-from .pseudo import DastUnparser
 
 # DistAlgo filename suffix
 DA_SUFFIX = "da"
@@ -44,9 +44,8 @@
 stdout = sys.stdout
 stderr = sys.stderr
 
-# Benchmark stats:
+# Benchmark stats (the input size is kept by the parser):
 WallclockStart = 0
-InputSize = 0
 OutputSize = 0
 
 def dastr_to_pyast(src, filename='<str>', args=None):
@@ -62,8 +61,8 @@ def dastr_to_pyast(src, filename='<str>', args=None):
     if daast is not None:
         pyast = PythonGenerator(filename, args).visit(daast)
         if pyast is None:
-            print("Error: unable to generate Python AST from DistAlgo AST"
-                  " for file ", filename, file=stderr)
+            stderr.write("Error: unable to generate Python AST from DistAlgo "
+                         "AST for file %s\n" % filename)
         assert isinstance(pyast, list) and len(pyast) == 1 and \
             isinstance(pyast[0], ast.Module)
         pyast = pyast[0]
@@ -72,6 +71,59 @@ def dastr_to_pyast(src, filename='<str>', args=None):
     else:
         return None
 
+# Marks fields missing from a node in `_dump_ast`, where `None` and `...` can
+# be field values:
+_MISSING = object()
+
+def _dump_ast(node, fd):
+    """Writes the same text as `ast.dump(node, include_attributes=True)` to
+    file object `fd`, without building the whole dump in memory.
+
+    Matches `ast.dump` of Python 3.5 through 3.9.
+
+    """
+    # Items on the stack are either strings to be written verbatim, or
+    # 1-tuples holding a value still to be formatted:
+    stack = [(node,)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            fd.write(item)
+            continue
+        value = item[0]
+        if isinstance(value, ast.AST):
+            parts = [type(value).__name__ + '(']
+            cls = type(value)
+            for name in value._fields + value._attributes:
+                field = getattr(value, name, _MISSING)
+                if field is _MISSING:
+                    continue
+                # Like ast.dump, leave out optional fields that are unset; node
+                # classes declare a None default for these since Python 3.9:
+                if field is None and getattr(cls, name, _MISSING) is None:
+                    continue
+                if len(parts) > 1:
+                    parts.append(', ')
+                elif sys.version_info < (3, 7) and name in value._attributes:
+                    # ast.dump of Python 3.5 and 3.6 separates the attributes
+                    # of a node with no fields by a space:
+                    parts.append(' ')
+                parts.append(name + '=')
+                parts.append((field,))
+            parts.append(')')
+            stack.extend(reversed(parts))
+        elif isinstance(value, list):
+            parts = ['[']
+            for i, elt in enumerate(value):
+                if i > 0:
+                    parts.append(', ')
+                parts.append((elt,))
+            parts.append(']')
+            stack.extend(reversed(parts))
+        else:
+            fd.write(repr(value))
+    fd.write('\n')
+
 def dafile_to_pyast(filename, args=None):
     """Translates DistAlgo source file into executable Python AST.
 
@@ -81,20 +133,20 @@ def dafile_to_pyast(filename, args=None):
 
     """
     if args is None:
-        args = parse_compiler_args([])
+        args = _default_compiler_args()
     daast = daast_from_file(filename, args)
     if daast is not None:
         pyast = PythonGenerator(filename, args).visit(daast)
         if pyast is None:
-            print("Error: unable to generate Python AST from DistAlgo AST"
-                  " for file ", filename, file=stderr)
+            stderr.write("Error: unable to generate Python AST from DistAlgo "
+                         "AST for file %s\n" % filename)
             return None
         assert isinstance(pyast, list) and len(pyast) == 1 and \
             isinstance(pyast[0], ast.Module)
         pyast = pyast[0]
         ast.fix_missing_locations(pyast)
         if args and hasattr(args, 'dump_ast') and args.dump_ast:
-            print(ast.dump(pyast, include_attributes=True), file=stderr)
+            _dump_ast(pyast, stderr)
         return pyast
     else:
         return None
@@ -175,17 +227,62 @@ def _sanitize_filename(dfile, no_symlink=True):
     dirname = os.path.abspath(dirname)
     dfile = os.path.join(dirname, basename)
     if no_symlink:
-        if os.path.islink(dfile):
+        try:
+            mode = os.lstat(dfile).st_mode
+        except OSError:
+            # As with os.path.exists, treat unreadable paths as nonexistent:
+            mode = None
+        if mode is None:
+            pass
+        elif stat.S_ISLNK(mode):
             msg = ('{} is a symlink and will be changed into a regular file if '
                    'the compiler writes a compiled file to it')
             raise FileExistsError(msg.format(dfile))
-        elif os.path.exists(dfile) and not os.path.isfile(dfile):
+        elif not stat.S_ISREG(mode):
             msg = ('{} is a non-regular file and will be changed into a regular '
                    'one if the compiler writes a compiled file to it')
             raise FileExistsError(msg.format(dfile))
     os.makedirs(dirname, exist_ok=True)
     return dfile
 
+def _source_purename(filename):
+    """Returns 'filename' without its suffix, or None if it should be skipped.
+
+    """
+    purename, suffix = os.path.splitext(filename)
+    suffix = suffix[1:]
+    if suffix == "py":
+        stderr.write("Warning: skipping '.py' file %s\n" % filename)
+        return None
+    elif suffix != DA_SUFFIX:
+        stderr.write("Warning: unknown suffix '%s' in filename '%s'\n" %
+                      (suffix, filename))
+    return purename
+
+def _write_textfile(textbuf, outname):
+    """Writes the contents of StringIO 'textbuf' to file 'outname'.
+
+    The text is encoded once and the file is replaced atomically, so that
+    concurrent readers never see a partially written file.
+
+    """
+    import importlib._bootstrap_external
+
+    importlib._bootstrap_external._write_atomic(
+        outname, textbuf.getvalue().encode('utf-8'))
+
+def _write_pyfile(tree, outname):
+    """Writes the source code for Python AST 'tree' to file 'outname'.
+
+    Returns the size of the generated code.
+
+    """
+    # Rendered in memory, so a failure in the unparser leaves no partial file:
+    textbuf = io.StringIO()
+    size = to_file(tree, textbuf)
+    _write_textfile(textbuf, outname)
+    return size
+
 def dafile_to_pseudofile(filename, outname=None, args=None):
     """Compiles a DistAlgo source file to Python file.
 
@@ -194,24 +291,19 @@ def dafile_to_pseudofile(filename, outname=None, args=None):
     filename is inferred by replacing the suffix of 'filename' with '.py'.
 
     """
-    purename, _, suffix = filename.rpartition(".")
-    if len(purename) == 0:
-        purename = suffix
-        suffix = ""
-    if suffix == "py":
-        stderr.write("Warning: skipping '.py' file %s\n" % filename)
+    purename = _source_purename(filename)
+    if purename is None:
         return
-    elif suffix != DA_SUFFIX:
-        stderr.write("Warning: unknown suffix '%s' in filename '%s'\n" %
-                      (suffix, filename))
     if outname is None:
         outname = purename + ".dap"
     outname = _sanitize_filename(outname)
     daast = daast_from_file(filename, args)
     if daast:
-        with open(outname, "w", encoding='utf-8') as outfd:
-            DastUnparser(daast, outfd)
-            stderr.write("Written pseudo code file %s.\n"% outname)
+        from .pseudo import DastUnparser
+        textbuf = io.StringIO()
+        DastUnparser(daast, textbuf)
+        _write_textfile(textbuf, outname)
+        stderr.write("Written pseudo code file %s.\n"% outname)
 
 def dafile_to_pyfile(filename, outname=None, args=None):
     """Compiles a DistAlgo source file to Python file.
@@ -225,25 +317,17 @@ def dafile_to_pyfile(filename, outname=None, args=None):
     'args.filename' with '.py'.
 
     """
-    purename, _, suffix = filename.rpartition(".")
-    if len(purename) == 0:
-        purename = suffix
-        suffix = ""
-    if suffix == "py":
-        stderr.write("Warning: skipping '.py' file %s\n" % filename)
+    purename = _source_purename(filename)
+    if purename is None:
         return
-    elif suffix != DA_SUFFIX:
-        stderr.write("Warning: unknown suffix '%s' in filename '%s'\n" %
-                      (suffix, filename))
     if outname is None:
         outname = purename + ".py"
     outname = _sanitize_filename(outname)
     pyast = dafile_to_pyast(filename, args)
     if pyast is not None:
-        with open(outname, "w", encoding='utf-8') as outfd:
-            global OutputSize
-            OutputSize += to_file(pyast, outfd)
-            stderr.write("Written compiled file %s.\n"% outname)
+        global OutputSize
+        OutputSize += _write_pyfile(pyast, outname)
+        stderr.write("Written compiled file %s.\n"% outname)
         return 0
     else:
         return 1
@@ -272,8 +356,11 @@ def dafile_to_pycfile(filename, outname=None, optimize=-1, args=None,
         else:
              bytecode = importlib._bootstrap_external._code_to_timestamp_pyc(
                 code, source_stats.st_mtime, source_stats.st_size)
-        mode = importlib._bootstrap_external._calc_mode(filename)
+        # Same as _calc_mode(filename), without stat'ing the source again:
+        mode = source_stats.st_mode | 0o200
         importlib._bootstrap_external._write_atomic(outname, bytecode, mode)
+        global OutputSize
+        OutputSize += len(bytecode)
         stderr.write("Written bytecode file {}.\n".format(outname))
         return 0
     else:
@@ -305,16 +392,9 @@ def dafile_to_incfiles(args):
     filename = args.infile
     outname = args.outfile
     incname = args.incfile
-    purename, _, suffix = filename.rpartition(".")
-    if len(purename) == 0:
-        purename = suffix
-        suffix = ""
-    if suffix == "py":
-        stderr.write("Warning: skipping '.py' file %s\n" % filename)
+    purename = _source_purename(filename)
+    if purename is None:
         return 2
-    elif suffix != DA_SUFFIX:
-        stderr.write("Warning: unknown suffix '%s' in filename '%s'\n" %
-                      (suffix, filename))
     daast = daast_from_file(filename, args)
     if outname is None:
         outname = purename + ".py"
@@ -322,13 +402,12 @@ def dafile_to_incfiles(args):
         incname = purename + "_inc.py" 
     if daast is not None:
         global OutputSize
+        from .incgen import gen_inc_module
         inc, ast = gen_inc_module(daast, args, filename=incname)
-        with open(outname, "w", encoding='utf-8') as outfd:
-            OutputSize += to_file(ast, outfd)
-            stderr.write("Written compiled file %s.\n"% outname)
-        with open(incname, "w", encoding='utf-8') as outfd:
-            OutputSize += to_file(inc, outfd)
-            stderr.write("Written interface file %s.\n" % incname)
+        OutputSize += _write_pyfile(ast, outname)
+        stderr.write("Written compiled file %s.\n"% outname)
+        OutputSize += _write_pyfile(inc, incname)
+        stderr.write("Written interface file %s.\n" % incname)
         return 0
     else:
         return 1
@@ -397,21 +476,65 @@ def parse_compiler_args(argv):
     args = ap.parse_args(argv)
     return args
 
-def main(argv=None):
-    """Main entry point when invoking compiler module from command line.
+# Result of `parse_compiler_args([])`, built on first use:
+_DefaultArgs = None
+
+def _default_compiler_args():
+    # The compiler only reads its arguments, so the defaults can be shared:
+    global _DefaultArgs
+    if _DefaultArgs is None:
+        _DefaultArgs = parse_compiler_args([])
+    return _DefaultArgs
+
+def _compile_file(args):
+    """Compiles the single source file 'args.infile' into the output selected
+    by 'args'.
+
+    Returns the result code and a dict of benchmark stats for this file. This
+    is run in worker processes when compiling several files in parallel, so
+    the stats are returned rather than left in module globals.
 
     """
-    if not check_python_version():
-        return 2
+    global OutputSize
+    from . import parser
+    parser.InputSize = OutputSize = 0
+    if args.ast_cache:
+        from . import astcache
+        astcache.Hits = astcache.Misses = 0
+    if args.debug is not None:
+        set_debug_level(args.debug)
 
-    if argv is None:
-        argv = sys.argv[1:]
+    if args.genpsd:
+        res = dafile_to_pseudofile(args.infile, args.psdfile, args)
+    elif args.geninc:
+        res = dafile_to_incfiles(args)
+    elif args.write_bytecode:
+        res = dafile_to_pycfile(args.infile, args.outfile, args.optimize,
+                                args=args)
+    else:
+        res = dafile_to_pyfile(args.infile, args.outfile, args)
+
+    stats = {"Input_size" : parser.InputSize,
+             "Output_size" : OutputSize}
+    if args.ast_cache:
+        stats["AST_cache_hits"] = astcache.Hits
+        stats["AST_cache_misses"] = astcache.Misses
+    return res, stats
+
+# The command line parser of `main`, built on first use:
+_ArgParser = None
+
+def _get_arg_parser():
+    global _ArgParser
+    if _ArgParser is not None:
+        return _ArgParser
     ap = argparse.ArgumentParser(description="DistAlgo compiler.",
                                  argument_default=argparse.SUPPRESS)
     _add_compiler_args(ap)
     ap.add_argument('-o', help="Output file name.",
                     dest="outfile", default=None)
-    ap.add_argument('-L', help="Logging output level.",
+    ap.add_argument('-L', help="Logging output level.", type=int,
+                    choices=range(DB_ERROR, DB_DEBUG + 1),
                     dest="debug", default=None)
     ap.add_argument('-i',
                     help="Generate interface code for plugging"
@@ -430,14 +553,43 @@ def main(argv=None):
     ap.add_argument('-B', '--benchmark',
                     help="Print the elapsed wallclock time of the compile session.",
                     action='store_true', default=False)
+    ap.add_argument('--ast-cache',
+                    help="Cache parsed DistAlgo ASTs under "
+                    "~/.cache/distalgo/ast and reuse them for unchanged "
+                    "source files.",
+                    action='store_true', default=False)
+    ap.add_argument('-j', '--jobs', type=int, default=1,
+                    help="Number of source files to compile in parallel, "
+                    "0 means one per CPU.")
     ap.add_argument('-p', help="Generate DistAlgo pseudo code.",
                     action='store_true', dest="genpsd", default=False)
     ap.add_argument("-v", "--version", action="version", version=__version__)
     ap.add_argument('--psdfile', help="Name of DistAlgo pseudo code output file.",
                     dest="psdfile", default=None)
-    ap.add_argument('infile', metavar='SOURCEFILE', type=str,
-                    help="DistAlgo input source file.")
+    ap.add_argument('infile', metavar='SOURCEFILE', type=str, nargs='+',
+                    help="DistAlgo input source files.")
+    _ArgParser = ap
+    return ap
+
+def main(argv=None):
+    """Main entry point when invoking compiler module from command line.
+
+    """
+    if not check_python_version():
+        return 2
+
+    if argv is None:
+        argv = sys.argv[1:]
+    ap = _get_arg_parser()
     args = ap.parse_args(argv)
+    if len(args.infile) > 1 and \
+       (args.outfile or args.incfile or args.psdfile):
+        ap.error("'-o', '-m' and '--psdfile' can only be used with a single "
+                 "source file")
+    if args.jobs < 0:
+        ap.error("'-j' must not be negative")
+    elif args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
 
     if args.benchmark:
         global WallclockStart
@@ -448,32 +600,29 @@ def main(argv=None):
         code.interact()
         return
 
-    if args.debug is not None:
-        try:
-            level = int(args.debug)
-            if is_valid_debug_level(level):
-                set_debug_level(level)
-            else:
-                raise ValueError()
-        except ValueError:
-            stderr.write("Invalid debugging level %s.\n" % str(args.debug))
-
-    if args.genpsd:
-        res = dafile_to_pseudofile(args.infile, args.psdfile, args)
-    elif args.geninc:
-        res = dafile_to_incfiles(args)
-    elif args.write_bytecode:
-        res = dafile_to_pycfile(args.infile, args.outfile, args.optimize,
-                                args=args)
+    jobs = [argparse.Namespace(**dict(vars(args), infile=infile))
+            for infile in args.infile]
+    if len(jobs) == 1:
+        results = [_compile_file(jobs[0])]
+    elif args.jobs == 1:
+        results = [_compile_file(job) for job in jobs]
     else:
-        res = dafile_to_pyfile(args.infile, args.outfile, args)
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            results = list(executor.map(_compile_file, jobs))
+    # Report the first failure, if any:
+    res = next((r for r, _ in results if r), results[0][0])
 
     if args.benchmark:
-        import json
         walltime = time.perf_counter() - WallclockStart
-        jsondata = {'Wallclock_time' : walltime,
-                    "Input_size" : InputSize,
-                    "Output_size" : OutputSize}
-        print("###OUTPUT: " + json.dumps(jsondata))
+        jsondata = {'Wallclock_time' : walltime}
+        for _, stats in results:
+            for key, value in stats.items():
+                jsondata[key] = jsondata.get(key, 0) + value
+        # Keys are plain names and values are numbers, so this is the same
+        # as json.dumps(jsondata) without importing json:
+        print("###OUTPUT: {" +
+              ", ".join('"{}": {!r}'.format(key, value)
+                        for key, value in jsondata.items()) + "}")
 
     return res
@@ -68,6 +68,10 @@ def set_debug_level(level):
 def is_valid_debug_level(level):
     return type(level) is int and DB_ERROR <= level and level <= DB_DEBUG
 
+def debug_enabled():
+    """True if messages passed to `printd` are printed."""
+    return Debug >= DB_DEBUG
+
 # Common utility functions
 
 def printe(mesg, lineno=0, col_offset=0, filename="", outfd=sys.stderr):
@@ -99,17 +103,18 @@ def __init__(self, cmdline_args, module_args, default=False):
         self.cmdline_args = cmdline_args
         self.module_args = module_args
         self.default = default
-
-    def __getattribute__(self, option):
-        if option in {'cmdline_args', 'module_args', 'default'}:
-            return super().__getattribute__(option)
-
-        if hasattr(self.cmdline_args, option):
-            return getattr(self.cmdline_args, option)
-        elif hasattr(self.module_args, option):
-            return getattr(self.module_args, option)
-        else:
-            return self.default
+        # Command line options take precedence over module options:
+        self._options = {}
+        if module_args is not None:
+            self._options.update(vars(module_args))
+        if cmdline_args is not None:
+            self._options.update(vars(cmdline_args))
+
+    def __getattr__(self, option):
+        # Only called for names that are not attributes of the manager itself:
+        if option.startswith('__'):
+            raise AttributeError(option)
+        return self._options.get(option, self.default)
 
 class CompilerMessagePrinter:
 
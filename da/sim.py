@@ -46,6 +46,11 @@
 
 logger = logging.getLogger(__name__)
 
+# Pickle protocol for messages sent over the network. Protocol 4 encodes
+# messages more compactly than protocol 3 (the default before Python 3.8), and
+# can be read by every Python version DistAlgo supports:
+MESSAGE_PICKLE_PROTOCOL = 4
+
 class DistProcessExit(BaseException):
     def __init__(self, code=0):
         super().__init__()
@@ -1302,8 +1307,10 @@ def _send_remote(self, src, dest, mesg, flags=0, transport=None, **params):
         """Forward `mesg` to remote process `dest`.
 
         """
-        self.log.debug("* Received forwarding request: %r to %s with flags=%d",
-                       mesg, dest, flags)
+        debug = self.log.isEnabledFor(logging.DEBUG)
+        if debug:
+            self.log.debug("* Received forwarding request: %r to %s with "
+                           "flags=%d", mesg, dest, flags)
         if dest.hostname != self.hostname:
             flags |= ChannelCaps.INTERHOST
         elif dest.transports == self.transport_manager.transport_addresses:
@@ -1319,22 +1326,32 @@ def _send_remote(self, src, dest, mesg, flags=0, transport=None, **params):
             raise NoAvailableTransportException()
         if not hasattr(self.local, 'buf') or self.local.buf is None:
             self.local.buf = bytearray(self.payload_size)
+            # Each thread reuses one pickler writing into its own buffer:
+            self.local.wrapper = common.BufferIOWrapper(self.local.buf)
+            self.local.pickler = pickle.Pickler(self.local.wrapper,
+                                                MESSAGE_PICKLE_PROTOCOL)
 
         if flags & ChannelCaps.BROADCAST:
             payload = (src, None, mesg)
         else:
             payload = (src, dest, mesg)
-        wrapper = common.BufferIOWrapper(self.local.buf)
+        wrapper = self.local.wrapper
+        wrapper.fptr = 0
         try:
-            pickle.dump(payload, wrapper)
+            self.local.pickler.dump(payload)
         except TypeError as e:
             raise InvalidMessageException("Error pickling {}.".format(payload)) \
                 from e
         except OSError as e:
             raise MessageTooBigException(
                 "** Outgoing message object too big to fit in buffer, dropped.")
-        self.log.debug("** Forwarding %r(%d bytes) to %s with flags=%d using %s.",
-                       mesg, wrapper.fptr, dest, flags, transport)
+        finally:
+            # Don't keep the message alive through the memo:
+            self.local.pickler.clear_memo()
+        if debug:
+            self.log.debug("** Forwarding %r(%d bytes) to %s with flags=%d "
+                           "using %s.", mesg, wrapper.fptr, dest, flags,
+                           transport)
         with memoryview(self.local.buf)[0:wrapper.fptr] as chunk:
             transport.send(chunk, dest.address_for_transport(transport),
                            **params)
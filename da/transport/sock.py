@@ -23,9 +23,12 @@
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import sys
+import hmac
 import time
 import random
+import hashlib
 import socket
+import struct
 import logging
 import threading
 
@@ -34,8 +37,6 @@
 from .mesgloop import SelectorLoop
 from ..common import VERSION_BYTES, get_runtime_option
 
-from itertools import chain
-
 __all__ = [
     "SocketTransport", "UdpTransport", "TcpTransport",
     "HEADER_SIZE", "BYTEORDER"
@@ -46,6 +47,8 @@
 HEADER_SIZE = 8
 ADDRESS_SIZE = 4
 BYTEORDER = 'big'
+# Message length header, an unsigned integer of HEADER_SIZE bytes in BYTEORDER:
+HEADER_STRUCT = struct.Struct('>Q')
 MAX_RETRIES = 3
 
 DEFAULT_MESSAGE_BUFFER_SIZE = (4 * 1024)
@@ -166,7 +169,12 @@ def __str__(self):
 
 
 # UDP Implementation:
+# Hash function for authenticating packets and connections. Passing the
+# constructor rather than its name saves a lookup on every packet:
+DIGEST_FUNC = hashlib.md5
 DIGEST_LENGTH = 16
+# Maximum number of packets received per wakeup of the message loop:
+MAX_UDP_BURST = 64
 DIGEST_HOLDER = b'0' * DIGEST_LENGTH
 
 @transport
@@ -206,8 +214,7 @@ def start(self, queue, mesgloop=None):
 
     def _packet_from(self, chunk):
         if self.authkey is not None:
-            import hmac
-            digest = hmac.new(self.authkey, chunk, 'md5').digest()
+            digest = hmac.new(self.authkey, chunk, DIGEST_FUNC).digest()
             return (VERSION_BYTES, digest, chunk)
         else:
             return (VERSION_BYTES, DIGEST_HOLDER, chunk)
@@ -217,8 +224,7 @@ def _verify_packet(self, chunk, addr):
             raise VersionMismatchException("wrong version: {}".format(chunk[:4]))
         if self.authkey is not None:
             with memoryview(chunk)[self.data_offset:] as data:
-                import hmac
-                digest = hmac.new(self.authkey, data, 'md5').digest()
+                digest = hmac.new(self.authkey, data, DIGEST_FUNC).digest()
                 if digest != chunk[4:self.data_offset]:
                     raise AuthenticationException(
                         "wrong digest from {}: {}"
@@ -233,8 +239,7 @@ def _sendmsg_nix(self, packet, target):
         return self.conn.sendmsg(packet, [], 0, target) == packet_size
 
     def _sendmsg_nt(self, packet, target):
-        from itertools import chain
-        buf = bytes(chain(*packet))
+        buf = b''.join(packet)
         return self.conn.sendto(buf, target) == len(buf)
 
     if sys.platform == 'win32':
@@ -274,12 +279,12 @@ def send(self, chunk, target, wait=0.01, retries=MAX_RETRIES, **_):
                     else:
                         time.sleep(wait)
 
-    def _recvmsg_nt(self):
-        chunk, remote = self.conn.recvfrom(self.buffer_size)
+    def _recvmsg_nt(self, flags=0):
+        chunk, remote = self.conn.recvfrom(self.buffer_size, flags)
         return chunk, None, 0, remote
 
-    def _recvmsg_nix(self):
-        return self.conn.recvmsg(self.buffer_size)
+    def _recvmsg_nix(self, flags=0):
+        return self.conn.recvmsg(self.buffer_size, 0, flags)
 
     if sys.platform == 'win32':
         _recvmsg = _recvmsg_nt
@@ -290,23 +295,37 @@ def _recvmsg_nix(self):
     else:
         _recvmsg = _recvmsg_nix
 
+    if hasattr(socket, 'MSG_DONTWAIT'):
+        burst_size = MAX_UDP_BURST
+    else:
+        burst_size = 1
+
     def _recvmesg1(self, _conn, _data):
+        # The socket is readable, so the first receive won't block. After
+        # that, keep receiving whatever else has arrived, without blocking:
+        flags = 0
         try:
-            chunk, _, flags, remote= self._recvmsg()
-            if not chunk:
-                # XXX: zero length packet == closed socket??
-                self._log.debug("Transport closed, terminating receive loop.")
-            elif flags & socket.MSG_TRUNC:
-                self._log.debug("Dropped truncated packet. ")
-            elif flags & socket.MSG_ERRQUEUE:
-                self._log.debug("No data received. ")
-            else:
-                try:
-                    self._verify_packet(chunk, remote)
-                    self.queue.append((self, chunk, remote))
-                except TransportException as e:
-                    self._log.warning("Packet from %s dropped due to: %r",
-                                      remote, e)
+            for _ in range(self.burst_size):
+                chunk, _, mflags, remote = self._recvmsg(flags)
+                flags = socket.MSG_DONTWAIT
+                if not chunk:
+                    # XXX: zero length packet == closed socket??
+                    self._log.debug(
+                        "Transport closed, terminating receive loop.")
+                    break
+                elif mflags & socket.MSG_TRUNC:
+                    self._log.debug("Dropped truncated packet. ")
+                elif mflags & socket.MSG_ERRQUEUE:
+                    self._log.debug("No data received. ")
+                else:
+                    try:
+                        self._verify_packet(chunk, remote)
+                        self.queue.append((self, chunk, remote))
+                    except TransportException as e:
+                        self._log.warning("Packet from %s dropped due to: %r",
+                                          remote, e)
+        except BlockingIOError:
+            pass
         except (socket.error, AttributeError) as e:
             self._log.debug("Terminating receive loop due to %r", e)
 
@@ -380,7 +399,8 @@ def initialize(self, strict=False, pipe=None, **params):
 
     def start(self, queue, mesgloop=None):
         self.conn.listen(MAX_TCP_BACKLOG)
-        self.conn.settimeout(TCP_DEFAULT_TIMEOUT)
+        # Non-blocking, so that `_accept` can drain the backlog:
+        self.conn.setblocking(False)
         super().start(queue, mesgloop)
         assert self.mesgloop is not None
         self.mesgloop.register(self.conn, self._accept)
@@ -403,11 +423,10 @@ def _deliver_challenge(self, conn, addr):
         import os
         digest = None
         if self.authkey is not None:
-            import hmac
             message = os.urandom(MESSAGE_LENGTH)
             self._send_1((KEY_CHALLENGE, VERSION_BYTES, message),
                          conn, addr)
-            digest = hmac.new(self.authkey, message, 'md5').digest()
+            digest = hmac.new(self.authkey, message, DIGEST_FUNC).digest()
         else:
             self._send_1((VER_CHALLENGE, VERSION_BYTES), conn, addr)
         return digest
@@ -453,7 +472,6 @@ def _answer_challenge(self, conn, addr):
         message = conn.recv(TCP_RECV_BUFFER_SIZE)
         self._log.debug("=========answering %r", message)
         if self.authkey is not None:
-            import hmac
             if message[:len(KEY_CHALLENGE)] != KEY_CHALLENGE:
                 self._send_challenge_reply(KEY_CHALLENGE, conn, addr)
                 raise AuthenticationException('{} has no cookie.'.
@@ -462,7 +480,7 @@ def _answer_challenge(self, conn, addr):
                 raise VersionMismatchException('Version at {} is different.'.
                                                format(addr))
             message = message[len(KEY_CHALLENGE)+4:]
-            digest = hmac.new(self.authkey, message, 'md5').digest()
+            digest = hmac.new(self.authkey, message, DIGEST_FUNC).digest()
             self._send_challenge_reply(digest, conn, addr)
         else:
             if message[:len(KEY_CHALLENGE)] == KEY_CHALLENGE:
@@ -489,19 +507,31 @@ def _send_challenge_reply(self, result, conn, addr):
         self._send_1((self.address_bytes, result), conn, addr)
 
     def _accept(self, conn, auxdata):
-        conn, addr = self.conn.accept()
-        self._log.debug("Accepted connection from %s.", addr)
-        digest = self._deliver_challenge(conn, auxdata)
-        self.mesgloop.register(conn, self._recvmesg_wrapper,
-                               (self._verify_challenge,
-                                AuxConnectionData(addr,
-                                                  self.buffer_size,
-                                                  digest)))
+        # Accept all pending connections in one go:
+        while True:
+            try:
+                conn, addr = self.conn.accept()
+            except BlockingIOError:
+                break
+            # Some platforms let accepted sockets inherit the listening
+            # socket's non-blocking mode:
+            conn.setblocking(True)
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._log.debug("Accepted connection from %s.", addr)
+            digest = self._deliver_challenge(conn, auxdata)
+            self.mesgloop.register(conn, self._recvmesg_wrapper,
+                                   (self._verify_challenge,
+                                    AuxConnectionData(addr,
+                                                      self.buffer_size,
+                                                      digest)))
 
     def _connect(self, target):
         self._log.debug("Initiating connection to %s.", target)
         conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         conn.settimeout(TCP_DEFAULT_TIMEOUT)
+        # Messages are written whole, so don't let Nagle's algorithm hold back
+        # a message while waiting for the peer to acknowledge the previous one:
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         conn.connect(target)
         try:
             self._answer_challenge(conn, target)
@@ -535,7 +565,7 @@ def send(self, chunk, target, retries=MAX_RETRIES, wait=0.05,
         if target is None:
             raise NoTargetTransportException()
 
-        header = int(len(chunk)).to_bytes(HEADER_SIZE, BYTEORDER)
+        header = HEADER_STRUCT.pack(len(chunk))
         message = (header, chunk)
         retry = 1
         saved = conn = None
@@ -586,13 +616,32 @@ def send(self, chunk, target, retries=MAX_RETRIES, wait=0.05,
                         except KeyError:
                             pass
 
-    def _send_1(self, data, conn, target=None):
-        buf = bytes(chain(*data))
+    def _send_1_nix(self, data, conn, target=None):
+        # Gather the parts in the kernel instead of joining them first:
+        buffers = [memoryview(part) for part in data]
+        total = sum(buf.nbytes for buf in buffers)
+        first = 0
+        while first < len(buffers):
+            sent = conn.sendmsg(buffers[first:])
+            while first < len(buffers) and sent >= buffers[first].nbytes:
+                sent -= buffers[first].nbytes
+                first += 1
+            if sent > 0:
+                buffers[first] = buffers[first][sent:]
+        self._log.debug("Sent %d bytes to %s.", total, target)
+
+    def _send_1_nt(self, data, conn, target=None):
+        buf = b''.join(data)
         failed = conn.sendall(buf)
         if failed:
             raise socket.error("Unable to send full chunk.")
         self._log.debug("Sent %d bytes to %s.", len(buf), target)
 
+    if sys.platform == 'win32':
+        _send_1 = _send_1_nt
+    else:
+        _send_1 = _send_1_nix
+
     def _recvmesg_wrapper(self, conn, job):
         callback, aux = job
         try:
@@ -625,14 +674,18 @@ def _receive_1(self, conn, aux):
             self._cleanup(conn, remote)
             return
 
-        self._log.debug("%d/%d bytes received from %s.", rlen, len(rbuf), remote)
+        # Checked once per call, as this runs for every batch of messages:
+        debug = self._log.isEnabledFor(logging.DEBUG)
+        if debug:
+            self._log.debug("%d/%d bytes received from %s.",
+                            rlen, len(rbuf), remote)
         datalen = fptr + rlen
         fptr = aux.lastptr
         aux.lastptr = 0
         cnt = 0
         while fptr < (datalen - HEADER_SIZE):
             pstart = fptr + HEADER_SIZE
-            psize = int.from_bytes(view[fptr:pstart], BYTEORDER)
+            psize, = HEADER_STRUCT.unpack_from(buf, fptr)
             pend = pstart + psize
             if psize > 0:
                 if pend <= datalen:
@@ -644,14 +697,17 @@ def _receive_1(self, conn, aux):
             else:
                 self._log.debug("Invalid message header: %d!", psize)
             fptr = pend
-        self._log.debug("%d message(s) received.", cnt)
+        if debug:
+            self._log.debug("%d message(s) received.", cnt)
         if fptr != datalen:
             leftover = datalen - fptr
-            self._log.debug("%d bytes leftover.", leftover)
+            if debug:
+                self._log.debug("%d bytes leftover.", leftover)
             if fptr > len(buf) / 2:
                 buf[:leftover] = buf[fptr:datalen]
                 aux.freeptr = leftover
-                self._log.debug("Leftover bytes moved to buffer start.")
+                if debug:
+                    self._log.debug("Leftover bytes moved to buffer start.")
             else:
                 aux.lastptr = fptr
                 aux.freeptr = datalen
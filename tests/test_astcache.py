@@ -0,0 +1,109 @@
+import os
+import sys
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from da.compiler import astcache, dast, symtab
+from da.compiler.parser import daast_from_file
+from da.compiler.ui import parse_compiler_args
+
+BASE_SRC = """
+class P(process):
+    def setup(): pass
+    def run(): output('base')
+"""
+
+MAIN_SRC = """
+from cachebase import P
+class Q(process, P):
+    def setup(): pass
+    def run(): output('derived')
+def main():
+    pass
+"""
+
+class TestAstCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.old_cache_dir = astcache.CACHE_DIR
+        astcache.CACHE_DIR = os.path.join(self.tmpdir, 'cache')
+        self.basefile = os.path.join(self.tmpdir, 'cachebase.da')
+        self.mainfile = os.path.join(self.tmpdir, 'cachemain.da')
+        with open(self.basefile, 'w') as outfd:
+            outfd.write(BASE_SRC)
+        with open(self.mainfile, 'w') as outfd:
+            outfd.write(MAIN_SRC)
+        sys.path.insert(0, self.tmpdir)
+        sys.path_importer_cache.clear()
+        self.args = parse_compiler_args([])
+        self.args.ast_cache = True
+
+    def tearDown(self):
+        sys.path.remove(self.tmpdir)
+        with symtab._modules_lock:
+            symtab.modules.pop('cachebase', None)
+        astcache.CACHE_DIR = self.old_cache_dir
+        shutil.rmtree(self.tmpdir)
+
+    def compile(self):
+        # Forget the resolved modules, as a fresh compiler process would:
+        with symtab._modules_lock:
+            symtab.modules.pop('cachebase', None)
+        hits, misses = astcache.Hits, astcache.Misses
+        daast = daast_from_file(self.mainfile, self.args)
+        return daast, astcache.Hits - hits, astcache.Misses - misses
+
+    def test_hit(self):
+        first, hits, misses = self.compile()
+        self.assertEqual((hits, misses), (0, 1))
+        second, hits, misses = self.compile()
+        self.assertEqual((hits, misses), (1, 0))
+        self.assertIsNot(first, second)
+        self.assertEqual([p.name for p in second.processes],
+                         [p.name for p in first.processes])
+
+    def test_dependency_changed(self):
+        _, hits, misses = self.compile()
+        self.assertEqual((hits, misses), (0, 1))
+        with open(self.basefile, 'w') as outfd:
+            outfd.write(BASE_SRC + "    def extra(): pass\n")
+        # Make sure the change shows in the stamp on coarse clocks:
+        stats = os.stat(self.basefile)
+        os.utime(self.basefile, ns=(stats.st_atime_ns,
+                                    stats.st_mtime_ns + 10**9))
+        _, hits, misses = self.compile()
+        self.assertEqual((hits, misses), (0, 1))
+        _, hits, misses = self.compile()
+        self.assertEqual((hits, misses), (1, 0))
+
+    def test_dependency_shadowed(self):
+        self.compile()
+        # A new module earlier on the path takes over the recorded name:
+        shadowdir = os.path.join(self.tmpdir, 'shadow')
+        os.mkdir(shadowdir)
+        shutil.copy(self.basefile, shadowdir)
+        sys.path.insert(0, shadowdir)
+        sys.path_importer_cache.clear()
+        try:
+            _, hits, misses = self.compile()
+        finally:
+            sys.path.remove(shadowdir)
+        self.assertEqual((hits, misses), (0, 1))
+
+    def test_pickle_node(self):
+        daast, _, _ = self.compile()
+        copy = pickle.loads(pickle.dumps(daast, pickle.HIGHEST_PROTOCOL))
+        self.assertIsInstance(copy, dast.Program)
+        self.assertEqual([type(p) for p in copy.processes],
+                         [type(p) for p in daast.processes])
+        self.assertEqual([p.name for p in copy.processes],
+                         [p.name for p in daast.processes])
+        proc = copy.processes[-1]
+        self.assertIs(proc.parent, copy)
+        self.assertEqual(proc.lineno, daast.processes[-1].lineno)
+
+
+if __name__ == '__main__':
+    unittest.main()
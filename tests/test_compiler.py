@@ -0,0 +1,175 @@
+import io
+import os
+import ast
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import contextlib
+
+from da.compiler import ui, symtab
+from da.compiler.parser import daast_from_str
+
+SOURCE = """
+class P(process):
+    def setup(n): pass
+    def run(): output('{}', n)
+def main():
+    ps = new(P, ({}, ), num=2)
+    start(ps)
+"""
+
+BASE_SOURCE = """
+class Base(process):
+    def setup(): pass
+    def run(): pass
+"""
+
+class TestCompilerMain(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.infiles = []
+        for i in range(3):
+            infile = os.path.join(self.tmpdir, 'mod{}.da'.format(i))
+            with open(infile, 'w') as outfd:
+                outfd.write(SOURCE.format(i, i))
+            self.infiles.append(infile)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def main(self, *argv):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), \
+             contextlib.redirect_stderr(stderr):
+            res = ui.main(list(argv))
+        return res, stdout.getvalue(), stderr.getvalue()
+
+    def outfiles(self):
+        return [os.path.splitext(infile)[0] + '.py' for infile in self.infiles]
+
+    def check_outputs(self):
+        for outfile in self.outfiles():
+            with open(outfile) as infd:
+                compile(infd.read(), outfile, 'exec')
+
+    def test_multiple_files(self):
+        res, _, stderr = self.main(*self.infiles)
+        self.assertFalse(res)
+        for infile in self.infiles:
+            self.assertIn(infile + " compiled with 0 errors", stderr)
+        self.check_outputs()
+
+    def test_jobs(self):
+        # Workers write their messages to the real stderr:
+        res, _, _ = self.main('-j', '2', *self.infiles)
+        self.assertFalse(res)
+        self.check_outputs()
+
+    def test_jobs_negative(self):
+        with self.assertRaises(SystemExit):
+            self.main('-j', '-1', *self.infiles)
+
+    def stats(self, *argv):
+        res, stdout, _ = self.main('-B', *argv)
+        self.assertFalse(res)
+        line, = [line for line in stdout.splitlines()
+                 if line.startswith('###OUTPUT: ')]
+        stats = json.loads(line[len('###OUTPUT: '):])
+        self.assertGreater(stats.pop('Wallclock_time'), 0)
+        return stats
+
+    def test_benchmark_stats(self):
+        single = [self.stats(infile) for infile in self.infiles]
+        self.assertEqual([stats['Input_size'] for stats in single],
+                         [os.path.getsize(infile) for infile in self.infiles])
+        # Stats of all files are summed, also when compiled by workers:
+        total = {key: sum(stats[key] for stats in single)
+                 for key in single[0]}
+        self.assertEqual(self.stats(*self.infiles), total)
+        self.assertEqual(self.stats('-j', '2', *self.infiles), total)
+
+    def test_single_output_options(self):
+        for option in ('-o', '-m', '--psdfile'):
+            with self.subTest(option=option):
+                with self.assertRaises(SystemExit):
+                    self.main(option, os.path.join(self.tmpdir, 'out'),
+                              *self.infiles)
+        # Still allowed with a single source file:
+        outfile = os.path.join(self.tmpdir, 'out.py')
+        res, _, _ = self.main('-o', outfile, self.infiles[0])
+        self.assertFalse(res)
+        self.assertTrue(os.path.exists(outfile))
+
+class TestDumpAst(unittest.TestCase):
+    def dump(self, tree):
+        buf = io.StringIO()
+        ui._dump_ast(tree, buf)
+        return buf.getvalue()
+
+    def test_ellipsis(self):
+        tree = ast.parse("x = ...\ndef f(a, *, b=None) -> ...: return None\n")
+        self.assertEqual(self.dump(tree),
+                         ast.dump(tree, include_attributes=True) + '\n')
+
+    def test_generated(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            infile = os.path.join(tmpdir, 'ellipsis.da')
+            with open(infile, 'w') as outfd:
+                outfd.write(SOURCE.format(0, 0) + "    x = ...\n")
+            with contextlib.redirect_stderr(io.StringIO()):
+                tree = ui.dafile_to_pyast(infile)
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(self.dump(tree),
+                         ast.dump(tree, include_attributes=True) + '\n')
+
+class TestResolver(unittest.TestCase):
+    SUBMODULES = ['x', 'y', 'z']
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        pkgdir = os.path.join(self.tmpdir, 'resolvepkg')
+        os.mkdir(pkgdir)
+        open(os.path.join(pkgdir, '__init__.py'), 'w').close()
+        for sub in self.SUBMODULES:
+            with open(os.path.join(pkgdir, sub + '.da'), 'w') as outfd:
+                outfd.write(BASE_SOURCE)
+        sys.path.insert(0, self.tmpdir)
+        sys.path_importer_cache.clear()
+
+    def tearDown(self):
+        sys.path.remove(self.tmpdir)
+        names = ['resolvepkg'] + ['resolvepkg.' + sub for sub in self.SUBMODULES]
+        with symtab._modules_lock:
+            for name in names:
+                symtab.modules.pop(name, None)
+        for name in names:
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.tmpdir)
+
+    def compile(self, src):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            daast = daast_from_str(src, args=ui.parse_compiler_args([]))
+        return daast, stderr.getvalue()
+
+    def test_base_from_submodule(self):
+        # The first statement assigns 'resolvepkg' once for each submodule:
+        _, stderr = self.compile("""
+import resolvepkg.x, resolvepkg.y
+import resolvepkg.z
+class P(process, resolvepkg.x.Base):
+    def setup(): pass
+    def run(): pass
+def main():
+    pass
+""")
+        self.assertNotIn("unable to find definition", stderr)
+        self.assertIn("compiled with 0 errors and 0 warnings", stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,13 @@
+import sys
 import time
 import socket
 import unittest
+import threading
 
-from da.common import WaitableQueue, QueueEmpty
+from da.common import WaitableQueue, QueueEmpty, VERSION_BYTES
 from da.transport import UdpTransport, TcpTransport, SelectorLoop, \
     AuthenticationException
+from da.transport.sock import HEADER_STRUCT, KEY_CHALLENGE
 
 LOCALHOST = socket.gethostbyname('localhost')
 
@@ -52,6 +55,37 @@ def test_auth(self):
         sender.close()
         self.transport.close()
 
+    @unittest.skipIf(UdpTransport.burst_size == 1,
+                     "non-blocking receive not supported")
+    def test_recv_burst(self):
+        self.transport.initialize()
+        # Receive by hand, so that everything sent below is pending at once:
+        self.transport.queue = self.queue
+        sender = UdpTransport(KEY)
+        sender.initialize()
+        forger = UdpTransport(authkey=b'2')
+        forger.initialize()
+        target = (LOCALHOST, self.transport.port)
+        payloads = [DATA + bytes([i]) for i in range(5)]
+        for i, payload in enumerate(payloads):
+            sender.send(payload, target)
+            if i == 2:
+                forger.send(DATA, target)
+        time.sleep(0.05)
+        with self.assertLogs('da.transport.sock.UdpTransport', level='WARN'):
+            self.transport._recvmesg1(self.transport.conn, None)
+        received = []
+        while True:
+            try:
+                _, packet, _ = self.queue.pop(block=False)
+            except QueueEmpty:
+                break
+            received.append(packet[self.transport.data_offset:])
+        self.assertEqual(received, payloads)
+        sender.close()
+        forger.close()
+        self.transport.close()
+
 class TestTcpTransport(unittest.TestCase):
     def setUp(self):
         self.transport = TcpTransport(KEY)
@@ -115,5 +149,58 @@ def test_auth(self):
         sender.close()
         self.transport.close()
 
+    def test_accept_many(self):
+        # Keep the message loop from running, so that the connections stay
+        # pending until `_accept` is called by hand:
+        self.mesgloop.start = lambda: None
+        self.transport.initialize()
+        self.transport.start(self.queue, self.mesgloop)
+        target = (LOCALHOST, self.transport.port)
+        clients = [socket.create_connection(target, timeout=5)
+                   for _ in range(5)]
+        try:
+            self.transport._accept(self.transport.conn, None)
+            # The listening socket, plus one pending challenge per client:
+            self.assertEqual(len(self.mesgloop), 1 + len(clients))
+            for client in clients:
+                challenge = client.recv(256)
+                self.assertEqual(challenge[:len(KEY_CHALLENGE)], KEY_CHALLENGE)
+                self.assertEqual(
+                    challenge[len(KEY_CHALLENGE):len(KEY_CHALLENGE)+4],
+                    VERSION_BYTES)
+        finally:
+            for client in clients:
+                client.close()
+            for key in list(self.mesgloop.selector.get_map().values()):
+                if key.fileobj is not self.transport.conn:
+                    self.mesgloop.deregister(key.fileobj)
+                    key.fileobj.close()
+            self.transport.close()
+
+    @unittest.skipIf(sys.platform == 'win32', "uses sendmsg")
+    def test_send_large(self):
+        sender, recver = socket.socketpair()
+        sender.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        recver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        payload = bytes(range(256)) * 4096
+        header = HEADER_STRUCT.pack(len(payload))
+        expected = header + payload
+        received = bytearray()
+        def read():
+            while len(received) < len(expected):
+                data = recver.recv(65536)
+                if not data:
+                    break
+                received.extend(data)
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            self.transport._send_1_nix((header, payload), sender)
+        finally:
+            reader.join(5)
+            sender.close()
+            recver.close()
+        self.assertEqual(bytes(received), expected)
+
 if __name__ == '__main__':
     unittest.main()